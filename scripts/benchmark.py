@@ -0,0 +1,120 @@
+"""
+End-to-end benchmark of the create -> poll -> download -> combine pipeline against the local Pinterest API simulator.
+
+Each scenario runs in a separate process, so that peak RSS is measured per scenario.
+
+Usage:
+    python scripts/benchmark.py                              # 1, 50 and 500 accounts
+    python scripts/benchmark.py --accounts 10 100 --rows 50000 --report-delay 5 --latency 0.05
+    python scripts/benchmark.py --streaming --json bench_output.json
+    python scripts/benchmark.py --async-mode
+"""
+import argparse
+import glob
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.realpath(__file__)), '..')
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, 'src'))
+
+
+def run_scenario(args) -> dict:
+    import mock
+
+    from Pinterest.async_client import AsyncPinterestClient
+    from Pinterest.client import PinterestClient
+    from component import Component
+    from tests.simulator import PinterestSimulator
+
+    data_dir = tempfile.mkdtemp()
+    for folder in ('in', 'out/tables', 'out/files'):
+        os.makedirs(os.path.join(data_dir, folder))
+
+    with PinterestSimulator(accounts=args.scenario, rows_per_report=args.rows, report_delay=args.report_delay,
+                            latency=args.latency, rate_limit_every=args.rate_limit_every) as simulator:
+        parameters = {
+            'input_variant': 'report_specification',
+            'accounts': simulator.account_ids,
+            'destination': {'table_name': 'benchmark', 'incremental_loading': True},
+            'time_range': {'granularity': 'DAY', 'date_from': '2024-01-01', 'date_to': '2024-01-31'},
+            'report_specification': {'level': 'CAMPAIGN', 'columns': ['SPEND_IN_DOLLAR', 'IMPRESSION_1']},
+            'advanced': {'streaming_ingest': args.streaming, 'async_mode': args.async_mode}
+        }
+        with open(os.path.join(data_dir, 'config.json'), 'w') as config_file:
+            json.dump({'parameters': parameters, 'authorization': {}}, config_file)
+
+        os.environ['KBC_DATADIR'] = data_dir
+        client = PinterestClient(token='token', base_url=simulator.base_url)
+        component = Component()
+
+        async def create_async_client():
+            component._async_client = await AsyncPinterestClient.create(token='token', base_url=simulator.base_url)
+            return component._async_client
+
+        started = time.monotonic()
+        with mock.patch.object(Component, 'client', new_callable=mock.PropertyMock, return_value=client), \
+                mock.patch.object(component, '_create_async_client', create_async_client):
+            component.run()
+        wall_time = time.monotonic() - started
+
+    rows = args.scenario * args.rows
+    output_bytes = sum(os.path.getsize(path) for path in glob.glob(os.path.join(data_dir, 'out', 'tables', '*', '*')))
+    return dict(accounts=args.scenario,
+                wall_time=round(wall_time, 2),
+                requests=simulator.total_requests,
+                request_counts=simulator.request_counts,
+                peak_rss_mb=round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+                rows=rows,
+                rows_per_sec=round(rows / wall_time),
+                downloaded_mb=round(simulator.downloaded_bytes / 1e6, 1),
+                output_mb=round(output_bytes / 1e6, 1))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--accounts', type=int, nargs='+', default=[1, 50, 500], help='Account counts to benchmark')
+    parser.add_argument('--rows', type=int, default=10000, help='Rows per report')
+    parser.add_argument('--report-delay', type=float, default=3.0, help='Seconds until a report is FINISHED')
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds added to each API response')
+    parser.add_argument('--rate-limit-every', type=int, default=0, help='Reject every n-th API request with 429')
+    parser.add_argument('--streaming', action='store_true', help='Use streaming ingest')
+    parser.add_argument('--async-mode', action='store_true', help='Use the asynchronous run path')
+    parser.add_argument('--json', help='Write results into the JSON file')
+    parser.add_argument('--scenario', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.scenario:
+        import logging
+        logging.disable(logging.INFO)
+        print(json.dumps(run_scenario(args)))
+        return
+
+    results = []
+    print(f'{"accounts":>8} {"wall [s]":>9} {"requests":>9} {"peak RSS [MB]":>14} {"rows/s":>10}')
+    for accounts in args.accounts:
+        command = [sys.executable, __file__, '--scenario', str(accounts), '--rows', str(args.rows),
+                   '--report-delay', str(args.report_delay), '--latency', str(args.latency),
+                   '--rate-limit-every', str(args.rate_limit_every)]
+        if args.streaming:
+            command.append('--streaming')
+        if args.async_mode:
+            command.append('--async-mode')
+        output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        results.append(result)
+        print(f'{result["accounts"]:>8} {result["wall_time"]:>9} {result["requests"]:>9} '
+              f'{result["peak_rss_mb"]:>14} {result["rows_per_sec"]:>10}')
+
+    if args.json:
+        with open(args.json, 'w') as json_file:
+            json.dump(results, json_file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
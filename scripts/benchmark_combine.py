@@ -0,0 +1,77 @@
+"""
+Benchmark of the combine engines prepending Account_ID to downloaded reports (see `Component.combine_output_files`).
+
+A raw report with quoted values and embedded newlines is generated and combined by each engine into a single slice.
+
+Usage:
+    python scripts/benchmark_combine.py                  # 1 000 000 rows
+    python scripts/benchmark_combine.py --rows 5000000 --compress --json combine_output.json
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'src'))
+
+from output_writer import (ENGINE_BLOCKS, ENGINE_CSV, ENGINE_VECTORIZED, SliceWriter,  # noqa: E402
+                           numpy_installed, write_blocks_with_account, write_rows_with_account)
+
+
+def generate_report(path: str, rows: int):
+    with open(path, 'w', newline='') as report_file:
+        writer = csv.writer(report_file)
+        writer.writerow(['Date', 'Campaign ID', 'Campaign name', 'Spend in dollar', 'Impressions'])
+        for i in range(rows):
+            name = f'Campaign {i % 100}, "quoted"' if i % 10 else f'Campaign {i % 100}\nsecond line'
+            writer.writerow(['2024-01-01', i, name, f'{i * 0.01:.2f}', i * 10])
+
+
+def combine(engine: str, path: str, out_directory: str, compress: bool) -> int:
+    with SliceWriter(out_directory, engine, compress=compress) as out:
+        if engine == ENGINE_CSV:
+            with open(path, mode='rt') as in_file:
+                reader = csv.reader(in_file)
+                next(reader)
+                return write_rows_with_account(reader, out, '123456')
+        with open(path, mode='rb') as in_file:
+            in_file.readline()
+            return write_blocks_with_account(in_file, out, '123456', engine)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1000000, help='Rows of the generated report')
+    parser.add_argument('--compress', action='store_true', help='Gzip the output slice')
+    parser.add_argument('--json', help='Write results into the JSON file')
+    args = parser.parse_args()
+
+    folder = tempfile.mkdtemp()
+    path = os.path.join(folder, 'report.raw.csv')
+    generate_report(path, args.rows)
+    size_mb = os.path.getsize(path) / 1e6
+
+    engines = [ENGINE_CSV, ENGINE_BLOCKS] + ([ENGINE_VECTORIZED] if numpy_installed() else [])
+    results = []
+    print(f'{"engine":>10} {"time [s]":>9} {"rows/s":>12} {"MB/s":>8} {"speedup":>8}')
+    for engine in engines:
+        started = time.monotonic()
+        rows = combine(engine, path, folder, args.compress)
+        elapsed = time.monotonic() - started
+        result = dict(engine=engine, rows=rows, seconds=round(elapsed, 3), rows_per_sec=round(rows / elapsed),
+                      mb_per_sec=round(size_mb / elapsed, 1))
+        result['speedup'] = round(results[0]['seconds'] / elapsed, 1) if results else 1.0
+        results.append(result)
+        print(f'{engine:>10} {result["seconds"]:>9} {result["rows_per_sec"]:>12} {result["mb_per_sec"]:>8} '
+              f'{result["speedup"]:>8}')
+
+    if args.json:
+        with open(args.json, 'w') as json_file:
+            json.dump(results, json_file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
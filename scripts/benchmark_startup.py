@@ -0,0 +1,97 @@
+"""
+Startup time benchmark of the sync actions (load_accounts, list_templates, list_columns) against the local
+Pinterest API simulator.
+
+Each action runs in a fresh process, as it does in the platform, so that module imports are included.
+Reported are the process wall time, time of importing the component module and time of the action itself
+(medians of the repeats), and whether dateparser was imported.
+
+Usage:
+    python scripts/benchmark_startup.py
+    python scripts/benchmark_startup.py --repeats 10 --json startup_output.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.realpath(__file__)), '..')
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, 'src'))
+
+ACTIONS = ['load_accounts', 'list_templates', 'list_columns']
+
+
+def run_action(action: str, base_url: str) -> dict:
+    started = time.perf_counter()
+    import component
+    imported = time.perf_counter()
+
+    import mock
+    from Pinterest.client import PinterestClient
+
+    data_dir = tempfile.mkdtemp()
+    for folder in ('in', 'out/tables', 'out/files'):
+        os.makedirs(os.path.join(data_dir, folder))
+    parameters = {'accounts': ['1000', '1001'], 'report_specification': {'level': 'CAMPAIGN'}}
+    with open(os.path.join(data_dir, 'config.json'), 'w') as config_file:
+        json.dump({'action': action, 'parameters': parameters, 'authorization': {}}, config_file)
+    os.environ['KBC_DATADIR'] = data_dir
+
+    client = PinterestClient(token='token', base_url=base_url)
+    action_started = time.perf_counter()
+    with mock.patch.object(component.Component, 'client', new_callable=mock.PropertyMock, return_value=client):
+        component.Component().execute_action()
+    finished = time.perf_counter()
+    return dict(import_seconds=imported - started, action_seconds=finished - action_started,
+                dateparser_imported='dateparser' in sys.modules)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeats', type=int, default=5, help='Runs of each action')
+    parser.add_argument('--json', help='Write results into the JSON file')
+    parser.add_argument('--action', help=argparse.SUPPRESS)
+    parser.add_argument('--base-url', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.action:
+        import logging
+        logging.disable(logging.INFO)
+        result = run_action(args.action, args.base_url)
+        # the action prints its own result without a trailing newline
+        print('\n' + json.dumps(result))
+        return
+
+    from tests.simulator import PinterestSimulator
+
+    results = []
+    print(f'{"action":>15} {"process [s]":>12} {"import [s]":>11} {"action [s]":>11} {"dateparser":>11}')
+    with PinterestSimulator(accounts=2) as simulator:
+        for action in ACTIONS:
+            runs = []
+            for _ in range(args.repeats):
+                started = time.perf_counter()
+                command = [sys.executable, __file__, '--action', action, '--base-url', simulator.base_url]
+                output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+                run = json.loads(output.strip().splitlines()[-1])
+                run['process_seconds'] = time.perf_counter() - started
+                runs.append(run)
+            result = dict(action=action, dateparser_imported=any(run['dateparser_imported'] for run in runs))
+            for name in ('process_seconds', 'import_seconds', 'action_seconds'):
+                result[name] = round(statistics.median(run[name] for run in runs), 3)
+            results.append(result)
+            print(f'{action:>15} {result["process_seconds"]:>12} {result["import_seconds"]:>11} '
+                  f'{result["action_seconds"]:>11} {str(result["dateparser_imported"]):>11}')
+
+    if args.json:
+        with open(args.json, 'w') as json_file:
+            json.dump(results, json_file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
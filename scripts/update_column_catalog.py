@@ -0,0 +1,39 @@
+"""
+Regenerates the column catalog snapshot bundled with the component (src/column_catalog.json).
+
+Columns are retrieved from the API (see `column_catalog.fetch_available_columns`). Without credentials they are read
+from the report columns enum of the Pinterest OpenAPI description shipped in the `pinterest-generated-client` package,
+which is the list the API returns for an invalid column.
+
+Usage:
+    PINTEREST_TOKEN=<access token> PINTEREST_ACCOUNT_ID=<ad account id> python scripts/update_column_catalog.py
+    pip install pinterest-generated-client && python scripts/update_column_catalog.py
+"""
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'src'))
+
+from Pinterest.client import PinterestClient  # noqa: E402
+from column_catalog import SNAPSHOT_PATH, fetch_available_columns  # noqa: E402
+from configuration import LevelEnum  # noqa: E402
+
+
+def openapi_columns() -> list:
+    from openapi_generated.pinterest_client.model.reporting_column_async import ReportingColumnAsync
+    return list(ReportingColumnAsync.allowed_values[('value',)].values())
+
+
+if __name__ == '__main__':
+    if os.environ.get('PINTEREST_TOKEN'):
+        client = PinterestClient(token=os.environ['PINTEREST_TOKEN'])
+        account_id = os.environ['PINTEREST_ACCOUNT_ID']
+        levels = {level.value: fetch_available_columns(client, account_id, level.value) for level in LevelEnum}
+    else:
+        columns = openapi_columns()
+        levels = {level.value: columns for level in LevelEnum}
+    with open(SNAPSHOT_PATH, 'w') as snapshot:
+        json.dump(dict(created=int(time.time()), levels=levels), snapshot, indent=2)
+        snapshot.write('\n')
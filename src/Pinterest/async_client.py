@@ -0,0 +1,206 @@
+import asyncio
+import logging
+import time
+from typing import AsyncIterator
+
+import httpx
+from keboola.component import UserException
+from keboola.http_client import AsyncHttpClient
+
+from Pinterest.client import (BASE_URL, DEFAULT_HEADER, FORM_HEADER, MAX_RATE_LIMIT_RETRIES, access_token,
+                              bearer_header, error_message, refresh_token_body, retry_after, token_expiry)
+from Pinterest.governor import RateLimitGovernor
+
+REQUEST_TIMEOUT = 180
+# 429 is not retried by the http client, rate limits are handled by the governor
+RETRY_STATUS_CODES = [500, 502, 503, 504]
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+class AsyncPinterestClient:
+    """Asynchronous counterpart of `PinterestClient` for use on a single event loop
+
+    All requests (API calls and report downloads) share one pool of keep-alive connections. API calls go through
+    the same rate limit governor and failed calls are translated to the same UserException messages
+    as in `PinterestClient`.
+
+    Usage:
+        async with await AsyncPinterestClient.create(token=token) as client:
+            accounts = await client.list_accounts()
+    """
+
+    def __init__(self, token: str = '', refresh_token: str = '', user: str = '', passwd: str = '',
+                 base_url: str = BASE_URL, token_expires_at: float = None):
+        """Use `create` to get a client authorized by a refresh token
+
+        Args:
+            token: Access token used in authentication header
+            refresh_token: Used to refresh the access token when it is rejected by the API
+            user: Used with refresh token only
+            passwd: Used with refresh token only
+            base_url: Pinterest API URL (may point to a local API simulator in tests)
+            token_expires_at: Unix time when the access token expires (if known)
+        """
+        self._base_url = base_url
+        self._refresh_credentials = (refresh_token, user, passwd)
+        self._refresh_lock = asyncio.Lock()
+        self.access_token = token
+        self.token_expires_at = token_expires_at
+        # no default headers - presigned download URLs must not receive the API headers
+        self.client = AsyncHttpClient(base_url=base_url, timeout=REQUEST_TIMEOUT,
+                                      retry_status_codes=RETRY_STATUS_CODES,
+                                      auth_header=bearer_header(token))
+        self.governor = RateLimitGovernor()
+        # optional RunMetrics collector of API call durations
+        self.metrics = None
+
+    @classmethod
+    async def create(cls, token: str = '', refresh_token: str = '', user: str = '', passwd: str = '',
+                     base_url: str = BASE_URL, token_expires_at: float = None) -> 'AsyncPinterestClient':
+        """Create client authorized either by the token (if supplied) or by a refresh token
+
+        Args:
+            token: Access token - when supplied it is used in authentication header directly
+            refresh_token: Used to retrieve access token when token parameter was not provided
+                or when the token expired
+            user: Used with refresh token only
+            passwd: Used with refresh token only
+            base_url: Pinterest API URL
+            token_expires_at: Unix time when the supplied access token expires (if known)
+        """
+        if not token and not refresh_token:
+            raise UserException('Neither token nor refresh token were available')
+        client = cls(token, refresh_token, user, passwd, base_url=base_url, token_expires_at=token_expires_at)
+        if not token:
+            await client._refresh_access_token()
+        return client
+
+    async def _refresh_access_token(self):
+        refresh_token, user, passwd = self._refresh_credentials
+        async with AsyncHttpClient(base_url=self._base_url, timeout=REQUEST_TIMEOUT, auth=(user, passwd),
+                                   default_headers=FORM_HEADER) as client:
+            try:
+                response = await client.post('oauth/token', data=refresh_token_body(refresh_token))
+            except httpx.HTTPStatusError as e:
+                response = e.response.json() if e.response.content else {}
+        self.access_token = access_token(response)
+        self.token_expires_at = token_expiry(response)
+        await self.client.update_auth_header(bearer_header(self.access_token), overwrite=True)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def close(self):
+        await self.client.close()
+
+    async def _call_client_method(self, method: str, ep: str, description: str = '', table_name: str = '',
+                                  **kwargs):
+        """Send API request, see `PinterestClient._call_client_method`
+
+        Raises:
+            UserException: In case of error response
+        """
+        started = time.monotonic()
+        response = await self._request_authorized(method.upper(), ep, **kwargs)
+        elapsed = time.monotonic() - started
+        logging.debug(f'{method.upper()} {ep} ({description}): HTTP {response.status_code} in {elapsed:.3f} s')
+        if self.metrics:
+            self.metrics.add_time(f'api {description}', elapsed)
+        if response.is_success:
+            return response.json()
+        raise UserException(error_message(response.status_code, response.text, description, ep, table_name))
+
+    async def _request_authorized(self, method: str, ep: str, **kwargs) -> httpx.Response:
+        """Send request, refresh the access token and repeat the request when the token was rejected"""
+        token = self.access_token
+        response = await self._request_governed(method, ep, **kwargs)
+        if response.status_code != 401 or not self._refresh_credentials[0]:
+            return response
+        async with self._refresh_lock:
+            # the token may have been refreshed by another task meanwhile
+            if self.access_token == token:
+                logging.info('Access token was rejected, refreshing it.')
+                await self._refresh_access_token()
+        return await self._request_governed(method, ep, **kwargs)
+
+    async def _request_governed(self, method: str, ep: str, **kwargs) -> httpx.Response:
+        """Send request through the rate limit governor, requests rejected with 429 are retried"""
+        for attempt in range(MAX_RATE_LIMIT_RETRIES + 1):
+            wait = self.governor.reserve()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            try:
+                response = await self.client._request(method, ep, headers=DEFAULT_HEADER, **kwargs)
+            except httpx.HTTPStatusError as e:
+                response = e.response
+            self.governor.update(response.headers)
+            if response.status_code != 429 or attempt == MAX_RATE_LIMIT_RETRIES:
+                return response
+            delay = retry_after(response, attempt)
+            logging.warning(f'Rate limit exceeded for ep = {ep}, retrying in {delay:.0f} s.')
+            self.governor.backoff(delay)
+        return response
+
+    async def _iter_all(self, ep: str, request_params: dict, description: str) -> AsyncIterator[dict]:
+        while True:
+            response = await self._call_client_method('get', ep, params=request_params, description=description)
+            for item in response.get('items'):
+                yield item
+            bookmark = response.get('bookmark')
+            if not bookmark:
+                return
+            request_params['bookmark'] = bookmark
+
+    async def _list_all(self, ep: str, request_params: dict, description: str) -> list:
+        return [item async for item in self._iter_all(ep, request_params, description)]
+
+    async def list_accounts(self) -> list:
+        """List ad accounts, see `PinterestClient.list_accounts`"""
+        return await self._list_all('ad_accounts', {'page_size': 50}, 'listing accounts')
+
+    def iter_accounts(self) -> AsyncIterator[dict]:
+        """Iterate ad accounts page by page, see `PinterestClient.iter_accounts`"""
+        return self._iter_all('ad_accounts', {'page_size': 50}, 'listing accounts')
+
+    async def list_templates(self, account_id: str) -> list:
+        """List templates, see `PinterestClient.list_templates`"""
+        return await self._list_all(f'ad_accounts/{account_id}/templates', {'page_size': 50, 'order': 'DESCENDING'},
+                                    'listing templates')
+
+    async def create_report(self, account_id: str, body: dict, table_name='') -> dict:
+        """Create async request for an account analytics report, see `PinterestClient.create_report`"""
+        ep = f'ad_accounts/{account_id}/reports'
+        return await self._call_client_method('post', ep, json=body, description='creating a report request',
+                                              table_name=table_name)
+
+    async def create_report_from_template(self, account_id: str, template_id: str, time_range) -> dict:
+        """Create async request for an analytics report using a template,
+        see `PinterestClient.create_report_from_template`
+        """
+        ep = f'ad_accounts/{account_id}/templates/{template_id}/reports'
+        return await self._call_client_method('post', ep, json=time_range,
+                                              description='creating a report request using a template')
+
+    async def get_report_status(self, account_id: str, token: str) -> dict:
+        """Get status of the report, see `PinterestClient.get_report_status`"""
+        ep = f'ad_accounts/{account_id}/reports'
+        return await self._call_client_method('get', ep, params={'token': token},
+                                              description='reading report status')
+
+    async def download(self, url: str, result_file_path: str) -> int:
+        """Stream content of the report URL into a file
+
+        Returns:
+            Number of bytes written
+        """
+        size = 0
+        async with self.client.client.stream('GET', url) as res:
+            res.raise_for_status()
+            with open(result_file_path, 'wb') as out:
+                async for chunk in res.aiter_bytes(DOWNLOAD_CHUNK_SIZE):
+                    out.write(chunk)
+                    size += len(chunk)
+        return size
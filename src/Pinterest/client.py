@@ -1,14 +1,79 @@
 from keboola.component import UserException
 from keboola.http_client import HttpClient
+import logging
 import re
+import threading
+import time
+from typing import Iterator
+
+from Pinterest.governor import RateLimitGovernor
 
 BASE_URL = 'https://api.pinterest.com/v5'
 DEFAULT_HEADER = {
     'Content-Type': 'application/json'
 }
-AUTH_HEADER = {
-    'Authorization': None
+FORM_HEADER = {
+    'Content-Type': 'application/x-www-form-urlencoded'
 }
+MAX_RATE_LIMIT_RETRIES = 5
+CAMPAIGN_STATUSES = ['ACTIVE', 'PAUSED', 'ARCHIVED']
+
+
+def error_message(status_code: int, text: str, description: str, ep: str, table_name: str = '') -> str:
+    """Build user friendly message of a failed API call
+
+    Specifically handles the problem of incompatible selected columns.
+    """
+    msg_columns = re.search('Columns .* are not available.', text)
+    if msg_columns:
+        return f'Failed to create report {table_name}: {msg_columns.group()} Some metric & dimension ' \
+               f'combinations aren\'t supported. To create more complex reports it is recommended ' \
+               f'to use Pinterest Custom reports directly in the Pinterest platform.'
+    return f'HTTP Error {status_code} in {description}: ep = {ep}: {text}'
+
+
+def retry_after(response, attempt: int) -> float:
+    """Seconds to wait before a request rejected because of rate limit is retried"""
+    for header in ('Retry-After', 'x-ratelimit-reset'):
+        try:
+            return max(1.0, float(response.headers.get(header)))
+        except (TypeError, ValueError):
+            continue
+    return float(2 ** attempt)
+
+
+def refresh_token_body(refresh_token: str) -> dict:
+    return {
+        'grant_type': 'refresh_token',
+        'refresh_token': refresh_token,
+        'scope': 'ads:read'
+    }
+
+
+def access_token(response: dict) -> str:
+    """Access token from response of the oauth/token endpoint
+
+    Raises:
+        UserException: When the response does not contain the token
+    """
+    if not response.get('access_token'):
+        message = response.get('message')
+        if not message:
+            message = str(response)
+        raise UserException(f'Error retrieving access token from refresh token: {message}')
+    return response.get('access_token')
+
+
+def token_expiry(response: dict):
+    """Unix time when the access token from response of the oauth/token endpoint expires (None if unknown)"""
+    try:
+        return time.time() + float(response.get('expires_in'))
+    except (TypeError, ValueError):
+        return None
+
+
+def bearer_header(token: str) -> dict:
+    return {'Authorization': 'Bearer ' + token}
 
 
 class PinterestClient:
@@ -16,43 +81,51 @@ class PinterestClient:
     for all communication to Pinterest API.
     """
 
-    def __init__(self, token: str = '', refresh_token: str = '', user: str = '', passwd: str = ''):
+    def __init__(self, token: str = '', refresh_token: str = '', user: str = '', passwd: str = '',
+                 base_url: str = BASE_URL, token_expires_at: float = None):
         """Initialize HttpClient authorization based either on token (if supplied) or a refresh token
         (if token was missing).
 
+        When the refresh token is available, access token rejected by the API (HTTP 401) is refreshed
+        and the request is repeated. Current access token and its expiration are available
+        in `access_token` and `token_expires_at` attributes, so that the token can be reused by following runs.
+
         Args:
             token: Access token - when supplied it is used in authentication header directly
             refresh_token: Used to retrieve access token when token parameter was not provided
+                or when the token expired
             user: Used with refresh token only
             passwd: Used with refresh token only
+            base_url: Pinterest API URL (may point to a local API simulator in tests)
+            token_expires_at: Unix time when the supplied access token expires (if known)
 
         Returns:
             Initialized HttpClient object.
 
         """
-        if not token:
-            if not refresh_token:
-                raise UserException('Neither token nor refresh token were available')
-            client = HttpClient(base_url=BASE_URL,
-                                default_http_header={'Content-Type': 'application/x-www-form-urlencoded'},
-                                auth=(user, passwd))
-            body = {
-                'grant_type': 'refresh_token',
-                'refresh_token': refresh_token,
-                'scope': 'ads:read'
-            }
-            response = client.post('oauth/token', data=body)
-            if not response.get('access_token'):
-                message = response.get('message')
-                if not message:
-                    message = str(response)
-                raise UserException(f'Error retrieving access token from refresh token: {message}')
-            token = response.get('access_token')
-
-        AUTH_HEADER['Authorization'] = 'Bearer ' + token
-        self.client = HttpClient(base_url=BASE_URL,
+        if not token and not refresh_token:
+            raise UserException('Neither token nor refresh token were available')
+        self._base_url = base_url
+        self._refresh_credentials = (refresh_token, user, passwd)
+        self._refresh_lock = threading.Lock()
+        self.access_token = token
+        self.token_expires_at = token_expires_at
+        self.client = HttpClient(base_url=base_url,
                                  default_http_header=DEFAULT_HEADER,
-                                 auth_header=AUTH_HEADER)
+                                 auth_header=bearer_header(token))
+        if not token:
+            self._refresh_access_token()
+        self.governor = RateLimitGovernor()
+        # optional RunMetrics collector of API call durations
+        self.metrics = None
+
+    def _refresh_access_token(self):
+        refresh_token, user, passwd = self._refresh_credentials
+        client = HttpClient(base_url=self._base_url, default_http_header=FORM_HEADER, auth=(user, passwd))
+        response = client.post('oauth/token', data=refresh_token_body(refresh_token))
+        self.access_token = access_token(response)
+        self.token_expires_at = token_expiry(response)
+        self.client.update_auth_header(bearer_header(self.access_token), overwrite=True)
 
     def _call_client_method(self, method: str, ep: str, description: str = '', table_name: str = '', **kwargs):
         """This is a wrapper around request method provided by the HttpClient.
@@ -72,18 +145,45 @@ class PinterestClient:
             UserException: In case of error response
 
         """
-        response = self.client._request_raw(method, ep, **kwargs)
+        started = time.monotonic()
+        response = self._request_authorized(method, ep, **kwargs)
+        elapsed = time.monotonic() - started
+        logging.debug(f'{method.upper()} {ep} ({description}): HTTP {response.status_code} in {elapsed:.3f} s')
+        if self.metrics:
+            self.metrics.add_time(f'api {description}', elapsed)
         if response:
             return response.json()
-        msg_columns = re.search('Columns .* are not available.', response.text)
-        if msg_columns:
-            message = f'Failed to create report {table_name}: {msg_columns.group()} Some metric & dimension ' \
-                      f'combinations aren\'t supported. To create more complex reports it is recommended ' \
-                      f'to use Pinterest Custom reports directly in the Pinterest platform.'
-        else:
-            message = f'HTTP Error {response.status_code} in {description}: ep = {ep}: {response.text}'
-
-        raise UserException(message)
+        raise UserException(error_message(response.status_code, response.text, description, ep, table_name))
+
+    def _request_authorized(self, method: str, ep: str, **kwargs):
+        """Send request, refresh the access token and repeat the request when the token was rejected"""
+        token = self.access_token
+        response = self._request_governed(method, ep, **kwargs)
+        if response.status_code != 401 or not self._refresh_credentials[0]:
+            return response
+        with self._refresh_lock:
+            # the token may have been refreshed by another thread meanwhile
+            if self.access_token == token:
+                logging.info('Access token was rejected, refreshing it.')
+                self._refresh_access_token()
+        return self._request_governed(method, ep, **kwargs)
+
+    def _request_governed(self, method: str, ep: str, **kwargs):
+        """Send request through the rate limit governor
+
+        Every request waits for the governor, which learns the remaining quota from response headers.
+        Requests rejected with 429 are retried after the time requested by the API (or exponential backoff).
+        """
+        for attempt in range(MAX_RATE_LIMIT_RETRIES + 1):
+            self.governor.acquire()
+            response = self.client._request_raw(method, ep, **kwargs)
+            self.governor.update(response.headers)
+            if response.status_code != 429 or attempt == MAX_RATE_LIMIT_RETRIES:
+                return response
+            delay = retry_after(response, attempt)
+            logging.warning(f'Rate limit exceeded for ep = {ep}, retrying in {delay:.0f} s.')
+            self.governor.backoff(delay)
+        return response
 
     def list_accounts(self) -> list:
         """List ad accounts
@@ -96,22 +196,30 @@ class PinterestClient:
             List of structures with ad accounts details. Each structure contains 'id' and 'name' attributes
             (among other details).
 
+        Raises:
+            UserException: If error occurred - either specification problem or communication problem
+        """
+        return list(self.iter_accounts())
+
+    def iter_accounts(self) -> Iterator[dict]:
+        """Iterate ad accounts, see `list_accounts`
+
+        Accounts are yielded page by page, the next page is requested only when the accounts of the previous one
+        were consumed, so that the caller may process the accounts while the listing is still in progress.
+
         Raises:
             UserException: If error occurred - either specification problem or communication problem
         """
         request_params = {'page_size': 50}
-        total = []
         while True:
             ep = 'ad_accounts'
             response = self._call_client_method('get', ep, params=request_params, description='listing accounts')
-            items = response.get('items')
-            total.extend(items)
+            yield from response.get('items')
             bookmark = response.get('bookmark')
             if bookmark:
                 request_params['bookmark'] = bookmark
             else:
                 break
-        return total
 
     def list_templates(self, account_id: str) -> list:
         """List templates
@@ -142,6 +250,33 @@ class PinterestClient:
                 break
         return total
 
+    def list_campaigns(self, account_id: str) -> list:
+        """List campaigns of an account in all statuses (active, paused and archived)
+
+        API documentation: https://developers.pinterest.com/docs/api/v5/#operation/campaigns/list
+
+        Args:
+            account_id: Account ID
+
+        Returns:
+            List of campaigns. Each element has 'id' and 'name' attributes (among other details).
+
+        Raises:
+            UserException: If error occurred - either specification problem or communication problem
+        """
+        request_params = {'page_size': 250, 'entity_statuses': CAMPAIGN_STATUSES}
+        ep = f'ad_accounts/{account_id}/campaigns'
+        total = []
+        while True:
+            response = self._call_client_method('get', ep, params=request_params, description='listing campaigns')
+            total.extend(response.get('items'))
+            bookmark = response.get('bookmark')
+            if bookmark:
+                request_params['bookmark'] = bookmark
+            else:
+                break
+        return total
+
     def create_report(self, account_id: str, body: dict, table_name='') -> dict:
         """Create async request for an account analytics report
 
@@ -212,3 +347,42 @@ class PinterestClient:
         request_params = {'token': token}
         response = self._call_client_method('get', ep, params=request_params, description='reading report status')
         return response
+
+    def get_account_analytics(self, account_id: str, params: dict) -> list:
+        """Get analytics of the account synchronously
+
+        API documentation: https://developers.pinterest.com/docs/api/v5/#operation/ad_account/analytics
+
+        Args:
+            account_id: Account ID
+            params: Query parameters - start_date, end_date, columns (comma separated), granularity,
+                conversion windows and conversion_report_time
+
+        Returns:
+            List of structures with the requested columns ('DATE' and 'AD_ACCOUNT_ID' dimensions)
+
+        Raises:
+            UserException: If error occurred - either specification problem or communication problem
+        """
+        ep = f'ad_accounts/{account_id}/analytics'
+        return self._call_client_method('get', ep, params=params, description='reading account analytics')
+
+    def get_campaign_analytics(self, account_id: str, campaign_ids: list, params: dict) -> list:
+        """Get analytics of the campaigns synchronously
+
+        API documentation: https://developers.pinterest.com/docs/api/v5/#operation/campaigns/analytics
+
+        Args:
+            account_id: Account ID
+            campaign_ids: IDs of the campaigns (at most 250)
+            params: Query parameters, see `get_account_analytics`
+
+        Returns:
+            List of structures with the requested columns ('DATE' and 'CAMPAIGN_ID' dimensions)
+
+        Raises:
+            UserException: If error occurred - either specification problem or communication problem
+        """
+        ep = f'ad_accounts/{account_id}/campaigns/analytics'
+        return self._call_client_method('get', ep, params=dict(params, campaign_ids=','.join(campaign_ids)),
+                                        description='reading campaign analytics')
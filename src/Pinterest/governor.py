@@ -0,0 +1,91 @@
+import threading
+import time
+
+DEFAULT_RATE = 10.0
+DEFAULT_BURST = 10.0
+MIN_RATE = 0.1
+
+
+class RateLimitGovernor:
+    """Token bucket limiting rate of requests sent by a client
+
+    The governor is shared by all threads using the client. Every request takes one token, tokens are
+    refilled at `rate` per second up to `burst`. The bucket learns the actual quota from Pinterest rate limit
+    response headers (`x-ratelimit-remaining`, `x-ratelimit-reset`) and blocks all callers when the quota
+    is exhausted or a request was rejected with 429. Total time spent waiting is available in
+    `throttled_seconds`.
+    """
+
+    def __init__(self, rate: float = DEFAULT_RATE, burst: float = DEFAULT_BURST, clock=time.monotonic,
+                 sleep=time.sleep):
+        """
+        Args:
+            rate: Initial number of requests per second
+            burst: Maximum number of requests that may be sent at once
+            clock: Monotonic time source
+            sleep: Function used for waiting
+        """
+        self.rate = rate
+        self.burst = burst
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._tokens = burst
+        self._updated = clock()
+        self._blocked_until = 0.0
+        self.throttled_seconds = 0.0
+        self.throttled_requests = 0
+
+    def _refill(self, now: float):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self):
+        """Take a token, wait when none is available"""
+        wait = self.reserve()
+        if wait > 0:
+            self._sleep(wait)
+
+    def reserve(self) -> float:
+        """Take a token without waiting - used by asynchronous clients which wait on their own
+
+        Returns:
+            Number of seconds the caller has to wait before sending the request
+        """
+        with self._lock:
+            now = self._clock()
+            self._refill(now)
+            self._tokens -= 1
+            wait = max(-self._tokens / self.rate, self._blocked_until - now, 0)
+            if wait > 0:
+                self.throttled_seconds += wait
+                self.throttled_requests += 1
+        return wait
+
+    def update(self, headers):
+        """Adjust the bucket according to rate limit headers of a response"""
+        remaining = _header_number(headers, 'x-ratelimit-remaining')
+        reset = _header_number(headers, 'x-ratelimit-reset')
+        if remaining is None:
+            return
+        with self._lock:
+            now = self._clock()
+            self._refill(now)
+            self._tokens = min(self._tokens, remaining)
+            if reset and reset > 0:
+                self.rate = max(MIN_RATE, remaining / reset)
+                if remaining < 1:
+                    self._blocked_until = max(self._blocked_until, now + reset)
+
+    def backoff(self, seconds: float):
+        """Block all requests for given time - used when a request was rejected because of rate limit"""
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, self._clock() + seconds)
+
+
+def _header_number(headers, name: str):
+    value = headers.get(name) if headers else None
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
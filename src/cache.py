@@ -0,0 +1,74 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+
+
+def cache_key(*parts) -> str:
+    """Build cache key as a hash of JSON serializable parts"""
+    serialized = json.dumps(parts, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(serialized.encode('utf-8')).hexdigest()
+
+
+def load_json(path: str) -> dict:
+    """Load JSON file, missing or unreadable file results in an empty dictionary"""
+    try:
+        with open(path) as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as ex:
+        logging.debug(f'Ignoring unreadable file {path}: {ex}')
+        return {}
+
+
+class TTLCache:
+    """Key-value cache with time-to-live and size based eviction
+
+    Entries are kept in a plain JSON serializable dictionary, so the cache can be persisted
+    e.g. in the component state. Values must be JSON serializable as well.
+    """
+
+    def __init__(self, storage: dict, ttl: float, max_entries: int = 1000, clock=time.time):
+        """
+        Args:
+            storage: Dictionary holding the cache entries - it is modified in place
+            ttl: Time to live of an entry in seconds
+            max_entries: Maximum number of entries, the oldest entries are evicted first
+            clock: Time source (epoch seconds)
+        """
+        self.storage = storage
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.evict()
+
+    def get(self, key: str):
+        """Return cached value or None when the entry is missing or expired"""
+        with self._lock:
+            entry = self.storage.get(key)
+            if not entry:
+                return None
+            if entry['created'] + self.ttl < self._clock():
+                del self.storage[key]
+                return None
+            return entry['value']
+
+    def set(self, key: str, value):
+        with self._lock:
+            self.storage[key] = dict(created=self._clock(), value=value)
+        self.evict()
+
+    def evict(self):
+        """Remove expired entries and the oldest entries above the size limit"""
+        with self._lock:
+            now = self._clock()
+            for key in [key for key, entry in self.storage.items() if entry['created'] + self.ttl < now]:
+                del self.storage[key]
+            overflow = len(self.storage) - self.max_entries
+            if overflow > 0:
+                oldest = sorted(self.storage, key=lambda k: self.storage[k]['created'])[:overflow]
+                for key in oldest:
+                    del self.storage[key]
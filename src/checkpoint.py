@@ -0,0 +1,87 @@
+import threading
+import time
+from typing import Callable
+
+from cache import TTLCache
+
+CHECKPOINT_TTL = 12 * 3600
+MIN_SAVE_INTERVAL = 10.0
+
+
+class ReportCheckpoints:
+    """Tokens of submitted reports kept in the component state, so that an interrupted run can be resumed
+
+    Each checkpoint is identified by hash of the report request (see `Component._request_hash`) and holds token,
+    key and status of the report (CREATED, FINISHED, DOWNLOADED). Following run resumes polling of the tokens
+    instead of creating the reports again. Checkpoints expire after `ttl`, as Pinterest does not keep
+    the reports forever.
+
+    Statuses may be updated from any thread, the state is written by `save` which should be called
+    by the thread driving the run - writes are throttled to `min_save_interval`.
+    """
+
+    def __init__(self, storage: dict, save_function: Callable, ttl: float = CHECKPOINT_TTL,
+                 min_save_interval: float = MIN_SAVE_INTERVAL, clock=time.time):
+        """
+        Args:
+            storage: Dictionary in the state holding the checkpoints - it is modified in place
+            save_function: Function persisting the state
+            ttl: Time to live of a checkpoint in seconds
+            min_save_interval: Minimum interval between two writes of the state [s]
+            clock: Time source (epoch seconds)
+        """
+        self._cache = TTLCache(storage, ttl=ttl, max_entries=100000, clock=clock)
+        self._save_function = save_function
+        self._min_save_interval = min_save_interval
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._hashes = {}
+        self._dirty = False
+        self._last_save = None
+
+    def __len__(self):
+        return len(self._cache.storage)
+
+    def get(self, request_hash: str):
+        """Checkpoint of a report request ('token', 'key', 'status') or None when there is none"""
+        checkpoint = self._cache.get(request_hash)
+        if checkpoint:
+            with self._lock:
+                self._hashes[checkpoint['token']] = request_hash
+        return checkpoint
+
+    def add(self, request_hash: str, token: str, key: str):
+        """Record a newly created report"""
+        self._cache.set(request_hash, dict(token=token, key=key, status='CREATED'))
+        with self._lock:
+            self._hashes[token] = request_hash
+            self._dirty = True
+
+    def update(self, token: str, status: str):
+        """Record new status of a report"""
+        with self._lock:
+            request_hash = self._hashes.get(token)
+        checkpoint = self._cache.get(request_hash) if request_hash else None
+        if checkpoint:
+            with self._lock:
+                checkpoint['status'] = status
+                self._dirty = True
+
+    def save(self, force: bool = False):
+        """Persist the checkpoints when changed and the last write is older than `min_save_interval`"""
+        with self._lock:
+            now = self._clock()
+            if not self._dirty:
+                return
+            if not force and self._last_save is not None and now - self._last_save < self._min_save_interval:
+                return
+            self._dirty = False
+            self._last_save = now
+        self._save_function()
+
+    def clear(self):
+        """Remove all checkpoints - called when all reports were processed"""
+        with self._lock:
+            self._cache.storage.clear()
+            self._hashes.clear()
+            self._dirty = False
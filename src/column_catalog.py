@@ -0,0 +1,81 @@
+import datetime
+import os
+import time
+
+from keboola.component.exceptions import UserException
+
+from cache import load_json
+
+SNAPSHOT_PATH = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'column_catalog.json')
+# older snapshot is not trusted any more and the columns are retrieved from the API
+SNAPSHOT_TTL = 180 * 24 * 3600
+
+INVALID_COLUMN = 'NONSENSE_XXXXXX'
+
+
+def fetch_available_columns(client, account_id: str, level: str) -> list:
+    """List all columns available for reports of given level
+
+    Pinterest API does not provide list of available columns. We use a trick to retrieve it:
+
+    - Create a report request with invalid column list
+    - Catch reported exception and retrieve a list of 'good' columns provided there.
+
+    Args:
+        client: PinterestClient instance
+        account_id: Any account the client has access to
+        level: Report level
+
+    Returns:
+        List of column names
+
+    Raises:
+        UserException: When the list could not be retrieved
+    """
+    start_date = (datetime.date.today() - datetime.timedelta(days=30)).strftime('%Y-%m-%d')
+    end_date = (datetime.date.today() - datetime.timedelta(days=2)).strftime('%Y-%m-%d')
+    fake_body = {'start_date': start_date, 'end_date': end_date, 'granularity': 'DAY',
+                 'click_window_days': 7,
+                 'engagement_window_days': 7,
+                 'view_window_days': 7,
+                 'conversion_report_time': 'TIME_OF_AD_ACTION',
+                 'columns': [INVALID_COLUMN],
+                 'level': level,
+                 'report_format': 'CSV'}
+
+    try:
+        client.create_report(account_id=account_id, body=fake_body)
+    except UserException as ex:
+        key = f"'{INVALID_COLUMN}' is not one of ['"
+        s = str(ex)
+        start = s.find(key)
+        if start < 0:
+            raise ex
+        s = s[start + len(key):]
+        end = s.find("']")
+        s = s[:end]
+        return s.split("', '")
+
+    raise UserException('Failed to generate list of columns')
+
+
+def snapshot_columns(level: str, snapshot_path: str = SNAPSHOT_PATH, ttl: float = SNAPSHOT_TTL,
+                     clock=time.time):
+    """Columns of the level from the snapshot bundled with the component
+
+    The snapshot is generated before a release (see `scripts/update_column_catalog.py`), so the columns are available
+    without any API call.
+
+    Args:
+        level: Report level
+        snapshot_path: Path of the bundled snapshot
+        ttl: Time to live of the snapshot since its creation in seconds
+        clock: Time source (epoch seconds)
+
+    Returns:
+        List of column names, None when the level is missing in the snapshot or the snapshot is older than `ttl`
+    """
+    snapshot = load_json(snapshot_path)
+    if snapshot.get('created', 0) + ttl < clock():
+        return None
+    return snapshot.get('levels', {}).get(level)
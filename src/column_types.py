@@ -0,0 +1,168 @@
+import datetime
+import importlib.util
+import itertools
+import re
+
+from keboola.component.exceptions import UserException
+
+from configuration import retrieve_keys
+from output_writer import read_table_rows
+
+TYPE_STRING = 'STRING'
+TYPE_NUMERIC = 'NUMERIC'
+TYPE_DATE = 'DATE'
+TYPE_TIMESTAMP = 'TIMESTAMP'
+
+ROW_GROUP_SIZE = 100000
+
+# identifiers and names are strings even when the values look like numbers
+_STRING_SUFFIXES = (' ID', ' id', '_ID', '_id', ' name', ' Name')
+_NUMERIC = re.compile(r'^[+-]?(\d+(\.\d*)?|\.\d+)([eE][+-]?\d+)?$')
+_DATE = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+_TIMESTAMP = re.compile(r'^\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}(:\d{2}(\.\d+)?)?$')
+# candidate types in order of preference, a column falls back to the next one when a value does not match
+_CANDIDATES = [(TYPE_DATE, _DATE), (TYPE_TIMESTAMP, _TIMESTAMP), (TYPE_NUMERIC, _NUMERIC)]
+
+
+def declared_type(column: str):
+    """Type of a column known from its name (identifiers, names and other dimensions), None when unknown"""
+    if column == 'Date':
+        return None
+    if retrieve_keys([column]) or column.endswith(_STRING_SUFFIXES):
+        return TYPE_STRING
+    return None
+
+
+class ColumnTypeInference:
+    """Infers base types of report columns from their names and values
+
+    Columns with a declared type (see `declared_type`) keep it. Other columns start as the most specific
+    type and fall back to a more generic one whenever a value does not match (DATE, TIMESTAMP, NUMERIC,
+    STRING). Empty values match any type, columns with empty values only are strings.
+    """
+
+    def __init__(self, columns: list):
+        self.columns = columns
+        self._candidates = [None if declared_type(column) else 0 for column in columns]
+        self._seen = [False] * len(columns)
+
+    def update(self, row: list):
+        for index, value in enumerate(row[:len(self.columns)]):
+            candidate = self._candidates[index]
+            if candidate is None or not value:
+                continue
+            self._seen[index] = True
+            while candidate < len(_CANDIDATES):
+                if _matches(value, *_CANDIDATES[candidate]):
+                    break
+                candidate += 1
+            self._candidates[index] = candidate
+
+    def types(self) -> dict:
+        """Inferred type of each column by column name"""
+        result = {}
+        for column, candidate, seen in zip(self.columns, self._candidates, self._seen):
+            if candidate is None or not seen or candidate >= len(_CANDIDATES):
+                result[column] = declared_type(column) or TYPE_STRING
+            else:
+                result[column] = _CANDIDATES[candidate][0]
+        return result
+
+
+def infer_table_types(columns: list, paths: list, sample_rows: int = None) -> dict:
+    """Infer column types from rows of output table slices
+
+    All rows are inspected by default, so that the types hold for the whole table (a value found later
+    in the table would otherwise fail the typed import or the Parquet conversion).
+
+    Args:
+        columns: Columns of the table
+        paths: Slices of the table
+        sample_rows: Number of rows inspected, all rows when not set
+
+    Returns:
+        Base type of each column by column name
+    """
+    inference = ColumnTypeInference(columns)
+    for row in itertools.islice(read_table_rows(paths), sample_rows):
+        inference.update(row)
+    return inference.types()
+
+
+def _matches(value: str, column_type: str, pattern: re.Pattern) -> bool:
+    """Whether the value can be stored as the type (e.g. 2024-02-30 looks like a date, but is not one)"""
+    if not pattern.match(value):
+        return False
+    try:
+        _convert(value, column_type)
+    except ValueError:
+        return False
+    return True
+
+
+def _convert(value: str, column_type: str):
+    if not value:
+        return None
+    if column_type == TYPE_NUMERIC:
+        return float(value)
+    if column_type == TYPE_DATE:
+        return datetime.date.fromisoformat(value)
+    if column_type == TYPE_TIMESTAMP:
+        return datetime.datetime.fromisoformat(value)
+    return value
+
+
+def pyarrow_installed() -> bool:
+    """Whether pyarrow (optional dependency of the Parquet export) is available, without importing it"""
+    return importlib.util.find_spec('pyarrow') is not None
+
+
+def _arrow_type(column_type: str):
+    import pyarrow
+    return {TYPE_NUMERIC: pyarrow.float64(),
+            TYPE_DATE: pyarrow.date32(),
+            TYPE_TIMESTAMP: pyarrow.timestamp('us')}.get(column_type, pyarrow.string())
+
+
+def write_parquet(columns: list, types: dict, paths: list, out_path: str, row_group_size: int = ROW_GROUP_SIZE) -> int:
+    """Convert output table slices into a single typed Parquet file
+
+    Rows are converted and written in row groups, so only one row group is held in memory.
+
+    Args:
+        columns: Columns of the table
+        types: Base type of each column (see `infer_table_types`)
+        paths: Slices of the table
+        out_path: Path of the Parquet file
+        row_group_size: Number of rows in a row group
+
+    Returns:
+        Number of rows written
+
+    Raises:
+        UserException: When pyarrow is not installed or a value does not match type of its column
+    """
+    if not pyarrow_installed():
+        raise UserException('Parquet export requires the pyarrow package to be installed.')
+    # imported lazily, pyarrow import takes a significant part of the component startup
+    import pyarrow
+    import pyarrow.parquet
+    column_types = [types.get(column, TYPE_STRING) for column in columns]
+    schema = pyarrow.schema([(column, _arrow_type(column_type)) for column, column_type in zip(columns, column_types)])
+    rows = read_table_rows(paths)
+    count = 0
+    with pyarrow.parquet.ParquetWriter(out_path, schema, compression='snappy') as writer:
+        while True:
+            group = list(itertools.islice(rows, row_group_size))
+            if not group and count:
+                break
+            try:
+                values = [[_convert(row[index], column_type) for row in group]
+                          for index, column_type in enumerate(column_types)]
+            except (ValueError, IndexError) as e:
+                raise UserException(f'Failed to convert table rows to Parquet: {e}') from e
+            writer.write_table(pyarrow.Table.from_arrays(values, schema=schema))
+            count += len(group)
+            if len(group) < row_group_size:
+                break
+    return count
@@ -2,21 +2,60 @@
 Template Component main class.
 
 """
+import contextlib
 import csv
+import dataclasses
 import datetime
+import functools
+import itertools
+import json
 import logging
 import os
+import threading
 import time
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+from typing import TYPE_CHECKING, Iterable, Iterator
 
-import dateparser
-import requests
 from keboola.component.base import ComponentBase, sync_action
+from keboola.component.dao import TableMetadata
 from keboola.component.exceptions import UserException
 from keboola.component.sync_actions import SelectElement
-from keboola.utils.header_normalizer import DefaultHeaderNormalizer
 
 from Pinterest.client import PinterestClient
-from configuration import Configuration, retrieve_keys
+from cache import TTLCache, cache_key
+from checkpoint import ReportCheckpoints
+from column_catalog import fetch_available_columns, snapshot_columns
+from column_types import infer_table_types, pyarrow_installed, write_parquet
+from configuration import Configuration, Destination, retrieve_keys
+from dates import parse_date
+from dedup import deduplicate_slices
+from downloader import DownloadQueue, DownloadSession, bytes_read
+from metrics import RunMetrics
+from output_writer import (ENGINE_CSV, SharedHeader, SliceWriter, combine_engine, ingest_report_stream,
+                           report_slices, write_blocks_with_account, write_rows_with_account)
+from scheduler import PollingScheduler
+from sharding import align_start_date, shard_date_range, shard_entities
+from sync_analytics import (CAMPAIGN_BATCH_SIZE, analytics_params, analytics_rows, column_fields,
+                            is_small_report)
+
+if TYPE_CHECKING:
+    # the asynchronous run path is optional, its imports (httpx) are loaded only when it is used
+    from aiolimiter import AsyncLimiter
+    from Pinterest.async_client import AsyncPinterestClient
+
+STATE_LAST_EXTRACTED = 'last_extracted'
+STATE_REPORT_CACHE = 'report_cache'
+STATE_AUTHORIZATION = 'authorization'
+STATE_CHECKPOINTS = 'report_checkpoints'
+STATE_REPORT_LAYOUTS = 'report_layouts'
+# cached access token is refreshed when it expires sooner than this [s]
+TOKEN_EXPIRY_MARGIN = 6 * 3600
+REPORT_CACHE_MAX_ENTRIES = 500
+DEDUPLICATED_SLICES = 'deduplicated'
+# maximum number of campaign IDs in a report filter
+MAX_CAMPAIGN_FILTER = 500
+# report request attribute marking custom reports to be split by batches of campaign IDs
+SPLIT_BY_CAMPAIGNS = 'split_by_campaigns'
 
 
 class Component(ComponentBase):
@@ -34,6 +73,15 @@ class Component(ComponentBase):
         super().__init__()
         self.cfg: Configuration
         self._pinterest_client: PinterestClient = None
+        self._async_client: 'AsyncPinterestClient' = None
+        self._definitions: dict = {}
+        self._campaigns: dict = {}
+        self._campaigns_lock = threading.Lock()
+        self._state: dict = {}
+        self._report_cache: TTLCache = None
+        self._checkpoints: ReportCheckpoints = None
+        self._download_session: DownloadSession = None
+        self.metrics = RunMetrics()
 
     def run(self):
         """
@@ -41,84 +89,505 @@ class Component(ComponentBase):
 
         1. Initialize configuration based on parameters provided
         2. Check validity of configuration
-        3. Create report requests
+        3. Create report requests of all report definitions (the row itself and `additional_reports`)
             - Use either explicit report specification
             - Or use report templates
         4. Wait until all reports completed
-        5. Combine individual reports into resulting CSV table
-        6. Write table manifest
+        5. Combine individual reports into resulting CSV tables
+        6. Write table manifests
         """
         self.__init_configuration()
+        self._state = self.get_state_file()
+        if self.cfg.advanced.report_cache_ttl > 0:
+            self._report_cache = TTLCache(self._state.setdefault(STATE_REPORT_CACHE, {}),
+                                          ttl=self.cfg.advanced.report_cache_ttl * 60,
+                                          max_entries=REPORT_CACHE_MAX_ENTRIES)
+        else:
+            self._state.pop(STATE_REPORT_CACHE, None)
+        if self.cfg.advanced.resume_interrupted_runs:
+            self._checkpoints = ReportCheckpoints(self._state.setdefault(STATE_CHECKPOINTS, {}),
+                                                  save_function=self._write_checkpoint_state)
+        else:
+            self._state.pop(STATE_CHECKPOINTS, None)
 
         logging.info("Starting extraction v 2.0.0")
 
         # Validate configuration
-        if not self.cfg.accounts:
+        if not self.cfg.accounts and not self.cfg.all_accounts:
             raise UserException('No accounts for reporting specified')
-        if self.cfg.input_variant == "report_specification" and not self.cfg.report_specification.columns:
-            raise UserException('No columns selected in report specification')
-        if self.cfg.input_variant == "existing_report_ids" and not self.cfg.existing_report_ids:
-            raise UserException('No report IDs specified')
-
-        started_reports = []
-
-        if self.cfg.input_variant == 'report_specification':
-            report_body = self._prepare_report_body()
-            for account_id in self.cfg.accounts:
-                logging.info(f"Creating custom report {self.cfg.destination.table_name} in account {account_id}.")
-                response = self.client.create_report(account_id=account_id, body=report_body,
-                                                     table_name=self.cfg.destination.table_name)
-                started_reports.append(dict(key=account_id, account_id=account_id, token=response['token']))
+        self._definitions = {}
+        for definition in self._report_definitions():
+            self._validate_definition(definition)
+            self._definitions[definition.destination.table_name] = definition
+
+        report_requests = []
+        extracted_until = {}
+        for definition in self._definitions.values():
+            if self._discovers_accounts(definition):
+                continue
+            definition_requests, definition_extracted_until = self._prepare_report_requests(definition)
+            report_requests.extend(definition_requests)
+            extracted_until.update(definition_extracted_until)
+        # requests of discovered accounts are prepared while the accounts are being listed
+        discovery = any(self._discovers_accounts(definition) for definition in self._definitions.values())
+        if not report_requests and not discovery:
+            logging.info("All requested data were already extracted in previous runs, nothing to extract.")
+            self._state.pop(STATE_CHECKPOINTS, None)
+            self._store_access_token()
+            self.write_state_file(self._state)
+            return
+        if self._checkpoints:
+            logging.info(f"Found {len(self._checkpoints)} reports created by an interrupted run, "
+                         f"they will be resumed where possible.")
+
+        # small reports are served by the synchronous analytics endpoints once the other reports are downloaded
+        sync_requests = []
+        if self.cfg.advanced.sync_analytics:
+            eligible = [self._sync_analytics_fields(request) is not None for request in report_requests]
+            sync_requests = [request for request, sync in zip(report_requests, eligible) if sync]
+            report_requests = [request for request, sync in zip(report_requests, eligible) if not sync]
+
+        streaming = self.cfg.advanced.streaming_ingest
+        try:
+            if self.cfg.advanced.async_mode:
+                import asyncio
+                started_reports, headers = asyncio.run(self._run_reports_async(
+                    report_requests, streaming, extracted_until if discovery else None))
+            else:
+                report_requests = self._split_by_campaigns(report_requests)
+                if discovery:
+                    report_requests = itertools.chain(report_requests,
+                                                      self._discovered_report_requests(extracted_until))
+                with self.metrics.phase('report_creation'):
+                    started_reports = self._start_reports(report_requests)
+                self._save_checkpoints(force=True)
+                headers = self._process_reports(started_reports, streaming)
+        finally:
+            self._save_checkpoints(force=True)
+        if sync_requests:
+            with self.metrics.phase('sync_analytics'):
+                started_reports.extend(self._run_sync_reports(sync_requests, headers))
+        logging.info("Extraction finished")
+
+        written_reports = []
+        for table_name, definition in self._definitions.items():
+            table_reports = [report for report in started_reports if self._definition(report) is definition]
+            if table_reports:
+                self._write_table(definition, table_reports, headers.get(table_name))
+                written_reports.extend(table_reports)
+
+        self._log_metrics()
+
+        if self.cfg.time_range.incremental_state:
+            self._state.setdefault(STATE_LAST_EXTRACTED, {}).update(
+                self._completed_extraction(extracted_until, written_reports))
+        if self._checkpoints is not None:
+            self._checkpoints.clear()
+        self._state.pop(STATE_CHECKPOINTS, None)
+        self._store_access_token()
+        self.write_state_file(self._state)
+
+    @staticmethod
+    def _completed_extraction(extracted_until: dict, written_reports: list) -> dict:
+        """The last extracted dates of the state keys whose reports were generated and written into the output
+
+        A state key is never advanced by reports that were only requested, so that the next incremental run
+        extracts its time range again.
+        """
+        written = {report.get('state_key') for report in written_reports}
+        return {state_key: date for state_key, date in extracted_until.items() if state_key in written}
+
+    def _sync_analytics_fields(self, report_request: dict):
+        """Analytics fields of the report columns when the report can be served by the synchronous analytics
+
+        Small custom reports (see `sync_analytics.is_small_report`) are eligible when `advanced.sync_analytics`
+        is enabled and layout of the report CSV is known from a previous run, so that the synchronous response
+        can be written in the same layout.
+
+        Returns:
+            Analytics field of each report column (see `sync_analytics.column_fields`), None when not eligible
+        """
+        body = report_request.get('body')
+        if not self.cfg.advanced.sync_analytics or not body or not is_small_report(body):
+            return None
+        table_name = self._definition(report_request).destination.table_name
+        layout = self._state.get(STATE_REPORT_LAYOUTS, {}).get(table_name)
+        return column_fields(layout, body['columns']) if layout else None
+
+    def _run_sync_reports(self, report_requests: list, headers: dict) -> list:
+        """Get small reports from the synchronous analytics endpoints concurrently
+
+        Returns:
+            List of reports descriptors ('key', 'account_id', 'token' is None) in order of the requests
+        """
+        _ = self.client
+        with ThreadPoolExecutor(max_workers=max(1, self.cfg.advanced.max_concurrency)) as executor:
+            return list(executor.map(functools.partial(self._sync_report, headers=headers), report_requests))
+
+    def _sync_report(self, report_request: dict, headers: dict) -> dict:
+        """Get report from the synchronous analytics and write it as a downloaded report
+
+        Rows are written into the raw report file, or directly into the destination table with streaming ingest.
+        """
+        definition = self._definition(report_request)
+        table_name = definition.destination.table_name
+        account_id = report_request['account_id']
+        body = report_request['body']
+        fields = self._sync_analytics_fields(report_request)
+        params = analytics_params(body)
+        logging.info(f"Reading analytics {table_name} of account {account_id} synchronously.")
+        campaign_names = {}
+        with self.metrics.phase('sync_report', report_request['key']):
+            if body['level'] == 'CAMPAIGN':
+                campaigns = self._account_campaigns(account_id)
+                campaign_names = {str(campaign['id']): campaign['name'] for campaign in campaigns}
+                campaign_ids = body.get('campaign_ids') or list(campaign_names)
+                items = []
+                for index in range(0, len(campaign_ids), CAMPAIGN_BATCH_SIZE):
+                    items.extend(self.client.get_campaign_analytics(
+                        account_id, campaign_ids[index:index + CAMPAIGN_BATCH_SIZE], params))
+            else:
+                items = self.client.get_account_analytics(account_id, params)
+        rows = analytics_rows(items, fields, campaign_names)
+        report = self._report_descriptor(report_request, None)
+        layout = self._state[STATE_REPORT_LAYOUTS][table_name]
+        if headers:
+            headers[table_name].check(layout)
+            with self._slice_writer(self._table_path(definition), report) as out:
+                write_rows_with_account(rows, out, account_id)
         else:
-            time_range_body = self._prepare_time_range_body()
-            for item in self.cfg.existing_report_ids:
-                account_id, template_id = item.split(':')
-                logging.info(f"Creating report from template {template_id} in account {account_id}.")
-
-                response = self.client.create_report_from_template(account_id=account_id,
-                                                                   template_id=template_id,
-                                                                   time_range=time_range_body)
-                started_reports.append(dict(key=template_id, account_id=account_id, token=response['token']))
-
-        reports_to_check = started_reports
-
-        while reports_to_check:
-            next_reports = []
-            for report in reports_to_check:
-                response = self.client.get_report_status(report['account_id'], report['token'])
-                status = response['report_status']
-                if status == 'IN_PROGRESS':
-                    next_reports.append(report)
-                    continue
-                if status == 'FINISHED':
-                    report_url = response['url']
-                    raw_output_file = self._local_file(report['key'])
-                    self._download_file(report_url, raw_output_file)
-            reports_to_check = next_reports
-            if reports_to_check:
-                time.sleep(10)
-
-        keys, columns = self.check_output_files(started_reports)
+            with open(self._local_file(report['key']), mode='wt', newline='') as out_file:
+                writer = csv.writer(out_file)
+                writer.writerow(layout)
+                writer.writerows(rows)
+        self.metrics.add_report_values(report['key'], rows=len(rows))
+        return report
+
+    def _save_checkpoints(self, force: bool = False):
+        if self._checkpoints is not None:
+            self._checkpoints.save(force=force)
+
+    def _write_checkpoint_state(self):
+        """Write the state during the run, so that the next run can resume reports if this one is interrupted
+
+        The Keboola platform keeps only the state of successful jobs, the written state is thus picked up only
+        where the data folder outlives the run (e.g. local runs), see `advanced.resume_interrupted_runs`.
+        """
+        self._store_access_token()
+        self.write_state_file(self._state)
+
+    def _update_checkpoint(self, report: dict, status: str):
+        if self._checkpoints is not None:
+            self._checkpoints.update(report['token'], status)
+
+    def _report_definitions(self) -> list:
+        """Report definitions of the row - the row itself followed by its `additional_reports`
+
+        Each additional report is represented by a copy of the row configuration with its own destination
+        and report definition, accounts, time range and advanced settings are shared by all of them.
+        """
+        definitions = [self.cfg]
+        for report in self.cfg.additional_reports:
+            definitions.append(dataclasses.replace(self.cfg, input_variant=report.input_variant,
+                                                   destination=report.destination,
+                                                   report_specification=report.report_specification,
+                                                   existing_report_ids=report.existing_report_ids,
+                                                   additional_reports=[]))
+        return definitions
+
+    def _validate_definition(self, definition: Configuration):
+        if definition.destination.table_name in self._definitions:
+            raise UserException(f'Destination table {definition.destination.table_name} is used by more than one '
+                                f'report definition')
+        if definition.input_variant == "report_specification" and not definition.report_specification.columns:
+            raise UserException(f'No columns selected in report specification of '
+                                f'{definition.destination.table_name}')
+        if definition.input_variant == "existing_report_ids" and not definition.existing_report_ids:
+            raise UserException(f'No report IDs specified for {definition.destination.table_name}')
+        if self.cfg.time_range.incremental_state and not definition.destination.incremental_loading:
+            raise UserException(f'Continue from last run extracts only the days not extracted yet, Full load would '
+                                f'replace the whole table {definition.destination.table_name} by them. '
+                                f'Use Incremental load or disable Continue from last run.')
+        if definition.destination.parquet_export and not pyarrow_installed():
+            raise UserException(f'Parquet export of {definition.destination.table_name} requires the pyarrow package '
+                                f'to be installed.')
+
+    def _definition(self, report: dict) -> Configuration:
+        """Report definition a report request (or started report) belongs to"""
+        return self._definitions.get(report.get('table_name'), self.cfg)
+
+    def _table_path(self, definition: Configuration) -> str:
+        return os.path.join(self.tables_out_path, definition.destination.table_name)
+
+    def _write_table(self, definition: Configuration, reports: list, header: SharedHeader = None):
+        """Write output table of a report definition from its downloaded reports and the table manifest
+
+        Args:
+            definition: Report definition of the table
+            reports: Started reports descriptors of the definition
+            header: Header of the reports ingested by streaming ingest, None when raw files were downloaded
+        """
+        out_table_path = self._table_path(definition)
+        if header:
+            columns = list(header.columns)
+            keys = retrieve_keys(columns)
+        else:
+            with self.metrics.phase('check_output'):
+                keys, columns = self.check_output_files(reports)
+        if columns and self.cfg.advanced.sync_analytics:
+            # layout of the reports is needed to serve following small reports by the synchronous analytics
+            self._state.setdefault(STATE_REPORT_LAYOUTS, {})[definition.destination.table_name] = list(columns)
         keys.insert(0, 'Account_ID')
         columns.insert(0, 'Account_ID')
+        key_indexes = [columns.index(key) for key in keys]
 
+        # keboola.utils imports dateparser, which takes a significant part of the component startup
+        from keboola.utils.header_normalizer import DefaultHeaderNormalizer
         normalizer = DefaultHeaderNormalizer()
-        columns = normalizer.normalize_header(columns)
+        normalized_columns = normalizer.normalize_header(columns)
         keys = normalizer.normalize_header(keys)
 
-        table = self.create_out_table_definition(self.cfg.destination.table_name,
-                                                 incremental=self.cfg.destination.incremental_loading,
-                                                 primary_key=keys,
-                                                 columns=columns)
-
-        out_table_path = table.full_path
         os.makedirs(out_table_path, exist_ok=True)
-        logging.info("Extraction finished")
 
-        self.combine_output_files(out_table_path, started_reports)
+        if not header:
+            with self.metrics.phase('combine'):
+                self.combine_output_files(out_table_path, reports)
+
+        destination = definition.destination
+        if destination.deduplicate:
+            with self.metrics.phase('deduplicate'):
+                self._deduplicate_table(out_table_path, reports, destination, key_indexes)
 
+        table_metadata = None
+        if destination.column_types or destination.parquet_export:
+            with self.metrics.phase('column_types'):
+                slices = self._table_slices(out_table_path)
+                types = infer_table_types(columns, slices)
+                types = {normalized: types[column] for normalized, column in zip(normalized_columns, columns)}
+            if destination.column_types:
+                table_metadata = TableMetadata()
+                for column, column_type in types.items():
+                    table_metadata.add_column_data_type(column, column_type, nullable=True)
+            if destination.parquet_export:
+                with self.metrics.phase('parquet_export'):
+                    self._export_parquet(destination.table_name, normalized_columns, types, slices)
+
+        table = self.create_out_table_definition(destination.table_name,
+                                                 incremental=destination.incremental_loading,
+                                                 primary_key=keys,
+                                                 columns=normalized_columns,
+                                                 table_metadata=table_metadata)
         self.write_manifest(table)
 
+    def _deduplicate_table(self, out_table_path: str, reports: list, destination: Destination, key_indexes: list):
+        """Replace slices of the reports by slices without duplicate primary keys
+
+        Rows of reports later in the list replace rows of earlier reports with the same key (overlapping time
+        windows, retried or resumed reports). Large tables are deduplicated by partitions spilled to disk.
+        """
+        slices = [path for report in reports for path in report_slices(out_table_path, report['key'])]
+        with SliceWriter(out_table_path, DEDUPLICATED_SLICES, max_rows=destination.slice_max_rows,
+                         max_bytes=destination.slice_max_mb * 1024 * 1024, compress=destination.compress) as out:
+            deduplicator = deduplicate_slices(slices, key_indexes, out)
+        for path in slices:
+            os.remove(path)
+        duplicates = deduplicator.rows_in - deduplicator.rows_out
+        self.metrics.increment('duplicate_rows', duplicates)
+        logging.info(f'Removed {duplicates} rows with duplicate primary key from table {destination.table_name}.')
+
+    @staticmethod
+    def _table_slices(out_table_path: str) -> list:
+        return [os.path.join(out_table_path, name) for name in sorted(os.listdir(out_table_path))]
+
+    def _export_parquet(self, table_name: str, columns: list, types: dict, slices: list):
+        """Write the output table also as a typed Parquet file into `out/files`"""
+        name = f'{os.path.splitext(table_name)[0]}.parquet'
+        rows = write_parquet(columns, types, slices, os.path.join(self.files_out_path, name))
+        self.write_manifest(self.create_out_file_definition(name, tags=['pinterest', table_name]))
+        logging.info(f'Exported {rows} rows of table {table_name} into Parquet file {name}.')
+
+    def _process_reports(self, started_reports: list, streaming: bool) -> dict:
+        """Wait until reports are generated and download them
+
+        Status of the reports of all report definitions is polled by one scheduler while finished reports
+        are downloaded in the background by the download workers.
+
+        Returns:
+            Headers of the downloaded reports by destination table name when streaming ingest is used,
+            empty dictionary otherwise
+        """
+        scheduler = PollingScheduler(max_delay=self.cfg.advanced.max_poll_interval)
+        for report in started_reports:
+            scheduler.add(report['token'], report)
+
+        headers = {}
+        if streaming:
+            headers = self._prepare_streaming_headers()
+            download_function = functools.partial(self._stream_report, headers=headers)
+        else:
+            download_function = self._download_report
+
+        with DownloadQueue(download_function, max_workers=self.cfg.advanced.download_workers) as downloads, \
+                self.metrics.phase('report_generation'):
+            while scheduler:
+                downloads.raise_for_failures()
+                self._save_checkpoints()
+                token, report = scheduler.next_due()
+                response = self.client.get_report_status(report['account_id'], token)
+                status = response['report_status']
+                if status == 'IN_PROGRESS':
+                    scheduler.reschedule(token)
+                    continue
+                scheduler.complete(token)
+                if status != 'FINISHED' and report.get('cached'):
+                    logging.info(f"Cached report {token} is {status}, creating a new one.")
+                    new_report = self._create_report(report['request'], use_cache=False)
+                    scheduler.add(new_report['token'], new_report)
+                    continue
+                stats = scheduler.statistics(token)
+                self._record_report_status(report, status, stats['poll_count'], stats['wait_time'])
+                downloads.submit(response['url'], report)
+            downloads.join()
+        self.download_session.log_statistics()
+        return headers
+
+    def _prepare_streaming_headers(self) -> dict:
+        """Create destination table folders and shared headers of all report definitions for streaming ingest"""
+        headers = {}
+        for definition in self._definitions.values() or [self.cfg]:
+            os.makedirs(self._table_path(definition), exist_ok=True)
+            headers[definition.destination.table_name] = SharedHeader()
+        return headers
+
+    def _record_report_status(self, report: dict, status: str, poll_count: int, wait_time: float):
+        """Record the final status of a report
+
+        Raises:
+            UserException: When the report was not generated, so that the run does not succeed without its data
+        """
+        self._update_checkpoint(report, status)
+        self.metrics.add_report_values(report['key'], status_checks=poll_count, generation_seconds=wait_time)
+        logging.info(f"Report {report['key']} in account {report['account_id']} is {status} "
+                     f"after {poll_count} status checks ({wait_time:.1f} s).")
+        if status != 'FINISHED':
+            raise UserException(f"Report {report['key']} in account {report['account_id']} was not generated, "
+                                f"its status is {status}.")
+
+    async def _run_reports_async(self, report_requests: list, streaming: bool, discovery: dict = None) -> tuple:
+        """Create, wait for and download all reports on a single event loop
+
+        Each report is processed by its own task, so that a report is downloaded as soon as it is finished.
+        Report creation is bounded by `advanced.max_concurrency`, downloads by `advanced.download_workers`
+        and status checks follow the backoff and rate of the `PollingScheduler`. When any of the reports fails,
+        the remaining tasks are cancelled and the first exception is raised.
+
+        Args:
+            report_requests: Prepared report requests
+            streaming: Use streaming ingest
+            discovery: When set, reports of all accessible accounts are requested as the accounts are listed
+                and the last extracted dates of the discovered accounts are stored into this dictionary
+
+        Returns:
+            tuple: List of started reports descriptors in order of the requests, headers of the downloaded reports
+                by destination table name when streaming ingest is used (empty dictionary otherwise)
+        """
+        import asyncio
+        from aiolimiter import AsyncLimiter
+
+        headers = self._prepare_streaming_headers() if streaming else {}
+        polling = PollingScheduler(max_delay=self.cfg.advanced.max_poll_interval)
+        pipeline = dict(polling=polling,
+                        creation_slots=asyncio.Semaphore(max(1, self.cfg.advanced.max_concurrency)),
+                        download_slots=asyncio.Semaphore(max(1, self.cfg.advanced.download_workers)),
+                        poll_limiter=AsyncLimiter(1, polling.min_interval) if polling.min_interval else None,
+                        headers=headers)
+        async with await self._create_async_client() as client:
+            try:
+                async with asyncio.TaskGroup() as task_group:
+                    tasks = []
+                    for report_request in report_requests:
+                        # campaigns are listed by the synchronous client while the previous reports are processed
+                        split_requests = await asyncio.to_thread(self._campaign_report_requests, report_request) \
+                            if report_request.get(SPLIT_BY_CAMPAIGNS) else [report_request]
+                        for split_request in split_requests:
+                            tasks.append(task_group.create_task(
+                                self._extract_report_async(client, split_request, **pipeline)))
+                    if discovery is not None:
+                        async for account in client.iter_accounts():
+                            account_requests = await asyncio.to_thread(self._account_report_requests,
+                                                                       account['id'], discovery)
+                            for report_request in account_requests:
+                                tasks.append(task_group.create_task(
+                                    self._extract_report_async(client, report_request, **pipeline)))
+            except ExceptionGroup as e:
+                raise e.exceptions[0]
+        if self._download_session:
+            self._download_session.log_statistics()
+        return [task.result() for task in tasks], headers
+
+    async def _extract_report_async(self, client: 'AsyncPinterestClient', report_request: dict, polling,
+                                    creation_slots, download_slots, poll_limiter, headers) -> dict:
+        """Create a single report, wait until it is generated and download it"""
+        import asyncio
+
+        async with creation_slots:
+            with self.metrics.phase('report_creation'):
+                report = await self._create_report_async(client, report_request)
+        response, poll_count, wait_time = await self._wait_for_report_async(client, report, polling, poll_limiter)
+        status = response['report_status']
+        if status != 'FINISHED' and report.get('cached'):
+            logging.info(f"Cached report {report['token']} is {status}, creating a new one.")
+            report = await self._create_report_async(client, report_request, use_cache=False)
+            response, poll_count, wait_time = await self._wait_for_report_async(client, report, polling,
+                                                                                poll_limiter)
+            status = response['report_status']
+        self._record_report_status(report, status, poll_count, wait_time)
+        async with download_slots:
+            if headers:
+                await asyncio.to_thread(self._stream_report, response['url'], report, headers)
+            else:
+                await self._download_report_async(client, response['url'], report)
+        return report
+
+    async def _wait_for_report_async(self, client: 'AsyncPinterestClient', report: dict, polling: PollingScheduler,
+                                     poll_limiter: 'AsyncLimiter') -> tuple:
+        """Poll status of the report until it is no longer in progress
+
+        Returns:
+            tuple: Last report status response, number of status checks, seconds spent waiting
+        """
+        import asyncio
+
+        started = time.monotonic()
+        poll_count = 0
+        await asyncio.sleep(polling.first_probe_delay)
+        while True:
+            async with poll_limiter or contextlib.nullcontext():
+                response = await client.get_report_status(report['account_id'], report['token'])
+            poll_count += 1
+            if response['report_status'] != 'IN_PROGRESS':
+                break
+            self._save_checkpoints()
+            await asyncio.sleep(polling.delay(poll_count))
+        return response, poll_count, time.monotonic() - started
+
+    async def _download_report_async(self, client: 'AsyncPinterestClient', url: str, report: dict):
+        with self.metrics.phase('download', report['key']):
+            size = await client.download(url, self._local_file(report['key']))
+        self.metrics.add_report_values(report['key'], bytes=size)
+        self.metrics.increment('downloaded_bytes', size)
+        self._update_checkpoint(report, 'DOWNLOADED')
+
+    def _log_metrics(self):
+        """Log structured metrics of the run"""
+        governor = (self._async_client or self.client).governor
+        if governor.throttled_requests:
+            logging.info(f"{governor.throttled_requests} requests were throttled because of API rate limits "
+                         f"for {governor.throttled_seconds:.1f} s in total.")
+        self.metrics.increment('throttled_requests', governor.throttled_requests)
+        self.metrics.increment('throttled_seconds', round(governor.throttled_seconds, 3))
+        logging.info(f"Run metrics: {json.dumps(self.metrics.to_dict())}")
+
     def __init_configuration(self):
         try:
             self._validate_parameters(self.configuration.parameters, Configuration.get_dataclass_required_parameters(),
@@ -137,58 +606,448 @@ class Component(ComponentBase):
             raise UserException(
                 "The authorization is not set up. Please authorize the configuration with your Pinterest account first")
         if not self._pinterest_client:
-            api_token = self.configuration.parameters.get('#api_token')
-            refresh_token = user = passwd = ''
-            if hasattr(self.configuration, "oauth_credentials"):
-                user = self.configuration.oauth_credentials.appKey
-                passwd = self.configuration.oauth_credentials.appSecret
-                refresh_token = self.configuration.oauth_credentials.data.get('refresh_token')
-                pass
-            self._pinterest_client = PinterestClient(token=api_token,
-                                                     refresh_token=refresh_token,
-                                                     user=user,
-                                                     passwd=passwd)
+            with self.metrics.phase('authorization'):
+                self._pinterest_client = PinterestClient(**self._credentials())
+            self._pinterest_client.metrics = self.metrics
         return self._pinterest_client
 
+    async def _create_async_client(self) -> 'AsyncPinterestClient':
+        """Asynchronous Pinterest client authorized the same way as the `client`"""
+        from Pinterest.async_client import AsyncPinterestClient
+
+        if not self.configuration.oauth_credentials:
+            raise UserException(
+                "The authorization is not set up. Please authorize the configuration with your Pinterest account first")
+        with self.metrics.phase('authorization'):
+            self._async_client = await AsyncPinterestClient.create(**self._credentials())
+        self._async_client.metrics = self.metrics
+        return self._async_client
+
+    def _credentials(self) -> dict:
+        """Authorization uses '#api_token' parameter if provided, oauth credentials otherwise"""
+        api_token = self.configuration.parameters.get('#api_token')
+        refresh_token = user = passwd = ''
+        if self.configuration.oauth_credentials:
+            user = self.configuration.oauth_credentials.appKey
+            passwd = self.configuration.oauth_credentials.appSecret
+            refresh_token = self.configuration.oauth_credentials.data.get('refresh_token')
+        credentials = dict(token=api_token, refresh_token=refresh_token, user=user, passwd=passwd)
+        if not api_token and refresh_token:
+            credentials.update(self._cached_access_token(refresh_token))
+        return credentials
+
+    def _cached_access_token(self, refresh_token: str) -> dict:
+        """Access token obtained by a previous run from the same refresh token, if it is still valid
+
+        Returns:
+            dict: 'token' and 'token_expires_at' attributes, empty when there is no usable token
+        """
+        state = self._state or self.get_state_file() or {}
+        cached = state.get(STATE_AUTHORIZATION) or {}
+        if cached.get('refresh_token_hash') != cache_key(refresh_token) or not cached.get('#access_token'):
+            return {}
+        if (cached.get('expires_at') or 0) - time.time() < TOKEN_EXPIRY_MARGIN:
+            return {}
+        logging.debug('Reusing access token from the state.')
+        return dict(token=cached['#access_token'], token_expires_at=cached['expires_at'])
+
+    def _store_access_token(self):
+        """Keep access token obtained from the refresh token in the state, so it is reused by the following runs"""
+        client = self._async_client or self._pinterest_client
+        refresh_token = self._credentials()['refresh_token']
+        if not client or not refresh_token or not client.token_expires_at:
+            return
+        self._state[STATE_AUTHORIZATION] = {'#access_token': client.access_token,
+                                            'expires_at': client.token_expires_at,
+                                            'refresh_token_hash': cache_key(refresh_token)}
+
+    def _create_report(self, report_request: dict, use_cache: bool = True) -> dict:
+        """Submit a single report request and return descriptor of the started report
+
+        When an interrupted run created the same report (see `ReportCheckpoints`) or the report cache is enabled
+        and an identical report was requested recently, token of that report is reused instead of creating
+        a new one. Such descriptor is marked as 'cached' and holds the original request, so the report can be
+        re-created when the reused token is no longer valid.
+        """
+        cached = self._resumed_report(report_request) or self._cached_report(report_request) if use_cache else None
+        if cached:
+            return cached
+        response = self._send_report_request(self.client, report_request)
+        return self._started_report(report_request, response['token'])
+
+    async def _create_report_async(self, client: 'AsyncPinterestClient', report_request: dict,
+                                   use_cache: bool = True) -> dict:
+        """Asynchronous variant of `_create_report`"""
+        cached = self._resumed_report(report_request) or self._cached_report(report_request) if use_cache else None
+        if cached:
+            return cached
+        response = await self._send_report_request(client, report_request)
+        return self._started_report(report_request, response['token'])
+
+    @staticmethod
+    def _request_hash(report_request: dict) -> str:
+        return cache_key(report_request['account_id'], report_request.get('template_id'), report_request.get('body'),
+                         report_request.get('time_range'))
+
+    def _resumed_report(self, report_request: dict):
+        """Descriptor of the report created for the same request by an interrupted run (None if there is none)"""
+        if self._checkpoints is None:
+            return None
+        checkpoint = self._checkpoints.get(self._request_hash(report_request))
+        if not checkpoint:
+            return None
+        logging.info(f"Resuming report {checkpoint['token']} for {report_request['key']} in account "
+                     f"{report_request['account_id']} ({checkpoint['status']} in the interrupted run).")
+        return self._report_descriptor(report_request, checkpoint['token'], cached=True, request=report_request)
+
+    def _cached_report(self, report_request: dict):
+        """Descriptor of a recently created identical report from the report cache (None if there is none)"""
+        if not self._report_cache:
+            return None
+        cached = self._report_cache.get(self._request_hash(report_request))
+        if not cached:
+            return None
+        logging.info(f"Reusing cached report {cached['token']} for {report_request['key']} "
+                     f"in account {report_request['account_id']}.")
+        return self._report_descriptor(report_request, cached['token'], cached=True, request=report_request)
+
+    def _send_report_request(self, client, report_request: dict):
+        """Call the report creation endpoint of the client (synchronous or asynchronous)"""
+        account_id = report_request['account_id']
+        template_id = report_request.get('template_id')
+        if template_id:
+            logging.info(f"Creating report from template {template_id} in account {account_id}.")
+            return client.create_report_from_template(account_id=account_id, template_id=template_id,
+                                                      time_range=report_request['time_range'])
+        table_name = self._definition(report_request).destination.table_name
+        logging.info(f"Creating custom report {table_name} in account {account_id}.")
+        return client.create_report(account_id=account_id, body=report_request['body'], table_name=table_name)
+
+    def _started_report(self, report_request: dict, token: str) -> dict:
+        request_hash = self._request_hash(report_request)
+        if self._report_cache:
+            self._report_cache.set(request_hash, dict(token=token))
+        if self._checkpoints is not None:
+            self._checkpoints.add(request_hash, token, report_request['key'])
+        return self._report_descriptor(report_request, token)
+
+    @staticmethod
+    def _report_descriptor(report_request: dict, token: str, **attributes) -> dict:
+        """Descriptor of a started report ('key', 'account_id', 'token', 'table_name' and 'state_key' when set)"""
+        report = dict(key=report_request['key'], account_id=report_request['account_id'], token=token, **attributes)
+        for name in ('table_name', 'state_key'):
+            if report_request.get(name):
+                report[name] = report_request[name]
+        return report
+
+    def _start_reports(self, report_requests: Iterable[dict]) -> list:
+        """Submit report requests concurrently
+
+        Requests are sent through a thread pool bounded by `advanced.max_concurrency`. When any of the requests
+        fails, the requests not yet sent are cancelled and the first exception is raised. Requests may be
+        a lazy iterator, they are submitted as soon as they are prepared and no further requests are read
+        from it once a request failed.
+
+        Args:
+            report_requests: structures with 'key', 'account_id' and either 'body'
+                or 'template_id' and 'time_range' attributes
+
+        Returns:
+            List of started reports descriptors ('key', 'account_id', 'token') in order of the requests
+        """
+        max_workers = max(1, self.cfg.advanced.max_concurrency)
+        # client is initialized lazily - make sure it is created once before it is shared by the workers
+        _ = self.client
+        failure = threading.Event()
+
+        def check_failure(future):
+            if not future.cancelled() and future.exception():
+                failure.set()
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = []
+            for report_request in report_requests:
+                if failure.is_set():
+                    break
+                futures.append(executor.submit(self._create_report, report_request))
+                futures[-1].add_done_callback(check_failure)
+            done, _ = wait(futures, return_when=FIRST_EXCEPTION)
+            failed = [future for future in futures if future in done and future.exception()]
+            if failed:
+                executor.shutdown(wait=True, cancel_futures=True)
+                raise failed[0].exception()
+        return [future.result() for future in futures]
+
     def _prepare_dates_from_to(self) -> tuple:
-        date_from = dateparser.parse(self.cfg.time_range.date_from)
-        date_to = dateparser.parse(self.cfg.time_range.date_to)
+        date_from = parse_date(self.cfg.time_range.date_from)
+        date_to = parse_date(self.cfg.time_range.date_to)
         return date_from.strftime("%Y-%m-%d"), date_to.strftime("%Y-%m-%d")
 
-    def _prepare_report_body(self):
+    @staticmethod
+    def _discovers_accounts(definition: Configuration) -> bool:
+        """Whether reports of the definition are requested for all accessible accounts"""
+        return definition.all_accounts and definition.input_variant == 'report_specification'
+
+    def _account_report_requests(self, account_id: str, extracted_until: dict) -> list:
+        """Report requests of all report definitions using discovered accounts for a single account
+
+        Reports split by campaigns are already split, campaigns of the account are listed by this call.
+
+        Args:
+            account_id: Discovered account
+            extracted_until: The last extracted dates of the account are added into this dictionary
+        """
+        logging.info(f"Discovered account {account_id}.")
+        self.metrics.increment('discovered_accounts')
+        report_requests = []
+        for definition in self._definitions.values():
+            if self._discovers_accounts(definition):
+                definition_requests, definition_extracted_until = self._prepare_report_requests(definition,
+                                                                                                [account_id])
+                report_requests.extend(definition_requests)
+                extracted_until.update(definition_extracted_until)
+        return list(self._split_by_campaigns(report_requests))
+
+    def _discovered_report_requests(self, extracted_until: dict) -> Iterator[dict]:
+        """Report requests of all accessible accounts, prepared lazily while the accounts are being listed
+
+        Accounts are listed page by page, so reports of the accounts discovered first are created while further
+        pages of accounts are still being fetched.
+        """
+        for account in self.client.iter_accounts():
+            yield from self._account_report_requests(account['id'], extracted_until)
+
+    def _prepare_report_requests(self, definition: Configuration = None, account_ids: list = None) -> tuple:
+        """Prepare report requests for all accounts (or templates) and time windows of a report definition
+
+        Report keys and state keys of additional report definitions are prefixed by their destination table name,
+        so that they do not collide with other report definitions of the row. Custom reports split by campaigns
+        are only marked by `SPLIT_BY_CAMPAIGNS`, campaigns are listed later by `_split_by_campaigns`.
+
+        Args:
+            definition: Report definition (see `_report_definitions`), the row configuration by default
+            account_ids: Accounts to be reported instead of the configured ones (discovered accounts)
+
+        Returns:
+            tuple: List of report requests (see `_start_reports`), dictionary with the last extracted date
+                for each state key (account ID or account:template pair) to be stored once its reports are written
+        """
+        definition = definition or self.cfg
+        table_name = definition.destination.table_name
+        scope = '' if definition is self.cfg else table_name
+        report_requests = []
+        extracted_until = {}
+        if definition.input_variant == 'report_specification':
+            account_ids = definition.accounts if account_ids is None else account_ids
+            items = [(account_id, account_id, None) for account_id in account_ids]
+        else:
+            items = [(item, *item.split(':')) for item in definition.existing_report_ids]
+        split = definition.input_variant == 'report_specification' and self._splits_by_campaigns(definition)
+        for item, account_id, template_id in items:
+            state_key = f'{scope}/{item}' if scope else item
+            time_windows = self._prepare_time_windows(state_key=state_key, definition=definition)
+            for start_date, end_date in time_windows:
+                key = self._report_key(template_id or account_id, start_date, time_windows)
+                request = dict(key=f'{scope}_{key}' if scope else key, account_id=account_id,
+                               table_name=table_name, state_key=state_key)
+                if template_id:
+                    request.update(template_id=template_id,
+                                   time_range=self._prepare_time_range_body(start_date, end_date))
+                else:
+                    request.update(body=self._prepare_report_body(start_date, end_date, definition))
+                    if split:
+                        request[SPLIT_BY_CAMPAIGNS] = True
+                report_requests.append(request)
+            if time_windows:
+                # data of today are not complete yet, so today is extracted again by the next run
+                yesterday = (datetime.date.today() - datetime.timedelta(days=1)).strftime('%Y-%m-%d')
+                extracted_until[state_key] = min(time_windows[-1][1], yesterday)
+        return report_requests, extracted_until
+
+    def _prepare_time_windows(self, state_key: str = '', definition: Configuration = None) -> list:
+        """Prepare time windows to be reported for a single account (or template)
+
+        In incremental mode the start date is moved to the day after the last extracted date minus lookback.
+        The time range is then split into windows reported separately (see `advanced.max_days_per_report`).
+
+        Args:
+            state_key: Key of the last extracted date in the state (account ID or account:template pair)
+            definition: Report definition, the row configuration by default
+
+        Returns:
+            List of (start_date, end_date) tuples, empty when there is nothing new to extract
+        """
         start_date, end_date = self._prepare_dates_from_to()
+        if self.cfg.time_range.incremental_state and state_key:
+            if self.cfg.time_range.granularity.value == 'TOTAL':
+                logging.warning("Continuing from last run is not supported for TOTAL granularity, "
+                                "the whole time range is extracted.")
+            else:
+                start_date = self._incremental_start_date(state_key, start_date, definition or self.cfg)
+        if start_date > end_date:
+            logging.info(f"Data for {state_key} were already extracted until {end_date}, skipping.")
+            return []
+        time_windows = shard_date_range(start_date, end_date, self.cfg.time_range.granularity.value,
+                                        self.cfg.advanced.max_days_per_report)
+        if len(time_windows) > 1:
+            logging.info(f"Time range for {state_key} is split into {len(time_windows)} reports.")
+        return time_windows
+
+    def _incremental_start_date(self, state_key: str, start_date: str, definition: Configuration) -> str:
+        last_extracted = self._state.get(STATE_LAST_EXTRACTED, {}).get(state_key)
+        if not last_extracted:
+            return start_date
+        lookback_days = self._lookback_days(definition)
+        resume_date = datetime.date.fromisoformat(last_extracted) + datetime.timedelta(days=1 - lookback_days)
+        # whole week / month has to be reported again, partial one would overwrite the complete record
+        resume_date = align_start_date(resume_date, self.cfg.time_range.granularity.value).strftime('%Y-%m-%d')
+        if resume_date > start_date:
+            logging.info(f"Data for {state_key} were extracted until {last_extracted}, extracting from {resume_date} "
+                         f"(lookback {lookback_days} days).")
+            return resume_date
+        return start_date
+
+    def _lookback_days(self, definition: Configuration = None) -> int:
+        """Number of already extracted days to be extracted again in incremental mode
+
+        Uses `time_range.lookback_days` when set, otherwise the longest conversion window of the custom report.
+        """
+        if self.cfg.time_range.lookback_days > 0:
+            return self.cfg.time_range.lookback_days
+        definition = definition or self.cfg
+        if definition.input_variant == 'report_specification':
+            return max(int(definition.report_specification.click_window_days),
+                       int(definition.report_specification.engagement_window_days),
+                       int(definition.report_specification.view_window_days))
+        return 0
+
+    def _splits_by_campaigns(self, definition: Configuration) -> bool:
+        """Whether custom reports of the definition are split by campaigns (see `advanced.campaigns_per_report`)
+
+        Reports of advertiser levels aggregate all campaigns and can't be split.
+        """
+        if self.cfg.advanced.campaigns_per_report <= 0:
+            return False
+        level = definition.report_specification.level.value
+        if level.startswith('ADVERTISER'):
+            logging.warning(f"Report {definition.destination.table_name} of {level} level can't be split "
+                            f"by campaigns, it is created for all campaigns at once.")
+            return False
+        return True
+
+    def _split_by_campaigns(self, report_requests: Iterable[dict]) -> Iterator[dict]:
+        """Replace report requests marked by `SPLIT_BY_CAMPAIGNS` by requests of their campaign batches
+
+        Requests are split lazily, so reports of the first accounts are created while campaigns of the following
+        accounts are still being listed.
+        """
+        for report_request in report_requests:
+            if report_request.get(SPLIT_BY_CAMPAIGNS):
+                yield from self._campaign_report_requests(report_request)
+            else:
+                yield report_request
+
+    def _campaign_report_requests(self, report_request: dict) -> list:
+        """Requests of a custom report filtered by batches of campaign IDs of its account
+
+        Campaigns of each account are listed only once for all report definitions.
+
+        Returns:
+            Request of each batch (key suffixed by the batch number), the request itself when it is not split
+        """
+        report_request = {name: value for name, value in report_request.items() if name != SPLIT_BY_CAMPAIGNS}
+        account_id = report_request['account_id']
+        batch_size = min(self.cfg.advanced.campaigns_per_report, MAX_CAMPAIGN_FILTER)
+        campaign_ids = [campaign['id'] for campaign in self._account_campaigns(account_id)]
+        batches = shard_entities(campaign_ids, batch_size)
+        if batches == [None]:
+            return [report_request]
+        logging.info(f"Report {report_request['key']} in account {account_id} is split into {len(batches)} reports "
+                     f"by campaigns.")
+        return [dict(report_request, key=f"{report_request['key']}_part{index:03d}",
+                     body=dict(report_request['body'], campaign_ids=batch))
+                for index, batch in enumerate(batches)]
+
+    def _account_campaigns(self, account_id: str) -> list:
+        """Campaigns of the account, listed only once per run"""
+        with self._campaigns_lock:
+            if account_id not in self._campaigns:
+                self._campaigns[account_id] = self.client.list_campaigns(account_id)
+            return self._campaigns[account_id]
+
+    @staticmethod
+    def _report_key(key: str, start_date: str, time_windows: list) -> str:
+        """Key identifying report files - time window is added only when the time range was split"""
+        if len(time_windows) > 1:
+            return f'{key}_{start_date}'
+        return key
+
+    def _prepare_report_body(self, start_date: str = None, end_date: str = None, definition: Configuration = None):
+        if not start_date or not end_date:
+            start_date, end_date = self._prepare_dates_from_to()
+        report_specification = (definition or self.cfg).report_specification
         body = {'start_date': start_date, 'end_date': end_date, 'granularity': self.cfg.time_range.granularity.value,
-                'click_window_days': int(self.cfg.report_specification.click_window_days),
-                'engagement_window_days': int(self.cfg.report_specification.engagement_window_days),
-                'view_window_days': int(self.cfg.report_specification.view_window_days),
-                'conversion_report_time': self.cfg.report_specification.conversion_report_time.value,
-                'columns': self.cfg.report_specification.columns,
-                'level': self.cfg.report_specification.level.value,
+                'click_window_days': int(report_specification.click_window_days),
+                'engagement_window_days': int(report_specification.engagement_window_days),
+                'view_window_days': int(report_specification.view_window_days),
+                'conversion_report_time': report_specification.conversion_report_time.value,
+                'columns': report_specification.columns,
+                'level': report_specification.level.value,
                 'report_format': 'CSV'}
         return body
 
-    def _prepare_time_range_body(self):
-        start_date, end_date = self._prepare_dates_from_to()
+    def _prepare_time_range_body(self, start_date: str = None, end_date: str = None):
+        if not start_date or not end_date:
+            start_date, end_date = self._prepare_dates_from_to()
         body = {'start_date': start_date, 'end_date': end_date, 'granularity': self.cfg.time_range.granularity.value}
         return body
 
-    @staticmethod
-    def _download_file(url: str, result_file_path: str):
-        res = requests.get(url, stream=True, timeout=180)
-        res.raise_for_status()
-        with open(result_file_path, 'wb') as out:
-            for chunk in res.iter_content(chunk_size=8192):
-                out.write(chunk)
+    @property
+    def download_session(self) -> DownloadSession:
+        """Keep-alive HTTP session shared by all report downloads"""
+        if not self._download_session:
+            self._download_session = DownloadSession(pool_size=max(1, self.cfg.advanced.download_workers))
+        return self._download_session
+
+    def _download_file(self, url: str, result_file_path: str) -> int:
+        return self.download_session.download(url, result_file_path)
+
+    def _download_report(self, url: str, report: dict):
+        with self.metrics.phase('download', report['key']):
+            size = self._download_file(url, self._local_file(report['key'])) or 0
+        self.metrics.add_report_values(report['key'], bytes=size)
+        self.metrics.increment('downloaded_bytes', size)
+        self._update_checkpoint(report, 'DOWNLOADED')
+
+    def _stream_report(self, url: str, report: dict, headers: dict):
+        """Download report directly into its destination table
+
+        Report header is validated against the other reports of the table (`headers` by table name)
+        and Account_ID column is prepended while the response is consumed, so the report is processed
+        in a single pass without any intermediate file.
+        """
+        definition = self._definition(report)
+        header = headers[definition.destination.table_name]
+        with self.metrics.phase('download', report['key']), self.download_session.open_text(url) as in_file, \
+                self._slice_writer(self._table_path(definition), report) as out:
+            rows = ingest_report_stream(in_file, out, report['account_id'], header)
+            size = bytes_read(in_file)
+        self.metrics.add_report_values(report['key'], rows=rows, bytes=size)
+        self.metrics.increment('downloaded_bytes', size)
+        self._update_checkpoint(report, 'DOWNLOADED')
+
+    def _slice_writer(self, out_directory: str, report: dict) -> SliceWriter:
+        """Writer of output table slices of a single report according to settings of its destination"""
+        destination = self._definition(report).destination
+        return SliceWriter(out_directory, report['key'],
+                           max_rows=destination.slice_max_rows,
+                           max_bytes=destination.slice_max_mb * 1024 * 1024,
+                           compress=destination.compress)
 
     def _local_file(self, key: str) -> str:
         path = f'{self.files_out_path}/{key}.raw.csv'
         return path
 
-    @staticmethod
-    def _destination_file(out_directory: str, key: str) -> str:
-        path = f'{out_directory}/{key}.csv'
-        return path
-
     def check_output_files(self, file_descriptors: list) -> tuple:
         """Check consistency of downloaded reports
 
@@ -206,39 +1065,39 @@ class Component(ComponentBase):
         Raises:
             UserException: When there was a mismatch in headers
         """
-        header = None
+        header = SharedHeader()
         for item in file_descriptors:
             file = self._local_file(item['key'])
             with open(file, mode='rt') as out_file:
                 reader = csv.DictReader(out_file)
-                fields = reader.fieldnames
-                if not header:
-                    header = fields
-                else:
-                    if fields != header:
-                        mm = ''
-                        for a, b in zip(fields, header):
-                            if a != b:
-                                mm = f'{a}/{b}'
-                                break
-                        raise UserException(f'Headers of reports do not match: {mm}')
-        keys = retrieve_keys(header)
-        return keys, header
+                header.check(reader.fieldnames)
+        keys = retrieve_keys(header.columns)
+        return keys, header.columns
 
     def combine_output_files(self, out_directory, file_descriptors: list):
+        """Write downloaded reports into the destination table with Account_ID prepended to each row
+
+        By default records are copied as byte blocks without being parsed (see `output_writer.prefix_records`),
+        `advanced.combine_engine` selects the vectorized variant or parsing by the csv module. The csv module
+        is always used when the number of rows per slice is limited.
+        """
+        engine = combine_engine(self.cfg.advanced.combine_engine)
         for item in file_descriptors:
             key = item['key']
             account_id = item['account_id']
             file = self._local_file(key=key)
-            dest_path = self._destination_file(out_directory=out_directory, key=key)
-            with open(file, mode='rt') as in_file, open(dest_path, mode='wt') as out_file:
-                reader = csv.reader(in_file)
-                next(reader)  # skip header line
-                writer = csv.writer(out_file)
-                for row in reader:
-                    row.insert(0, account_id)
-                    writer.writerow(row)
-            pass
+            if engine == ENGINE_CSV or self._definition(item).destination.slice_max_rows:
+                with open(file, mode='rt') as in_file, self._slice_writer(out_directory, item) as out, \
+                        self.metrics.phase('combine_report', key):
+                    reader = csv.reader(in_file)
+                    next(reader)  # skip header line
+                    rows = write_rows_with_account(reader, out, account_id)
+            else:
+                with open(file, mode='rb') as in_file, self._slice_writer(out_directory, item) as out, \
+                        self.metrics.phase('combine_report', key):
+                    in_file.readline()  # skip header line
+                    rows = write_blocks_with_account(in_file, out, account_id, engine)
+            self.metrics.add_report_values(key, rows=rows)
 
     @sync_action('load_accounts')
     def load_accounts(self):
@@ -248,10 +1107,7 @@ class Component(ComponentBase):
 
     @sync_action('list_templates')
     def list_templates(self):
-        all_templates = []
-        for account_id in self.configuration.parameters.get('accounts'):
-            account_templates = self.client.list_templates(account_id=account_id)
-            all_templates.extend(account_templates)
+        all_templates = self._list_templates(self.configuration.parameters.get('accounts'))
 
         result = [SelectElement(
             value=f'{templ["ad_account_id"]}:{templ["id"]}',
@@ -260,18 +1116,57 @@ class Component(ComponentBase):
         ]
         return result
 
+    def _list_templates(self, account_ids: list) -> list:
+        """List templates of all accounts
+
+        Accounts are processed concurrently, so the sync action does not take one round trip per account.
+
+        Returns:
+            List of templates of all accounts in order of the accounts
+        """
+        client = self.client
+        max_workers = max(1, self.configuration.parameters.get('advanced', {}).get('max_concurrency', 10))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(client.list_templates, account_id=account_id) for account_id in account_ids]
+            all_templates = []
+            for future in futures:
+                all_templates.extend(future.result())
+        return all_templates
+
     @sync_action('list_columns')
     def list_columns(self):
         """List all available columns
 
-        Pinterest API does not provide list of available columns. We use a trick to retrieve it:
-
-        - Create a report request with invalid column list
-        - Catch reported exception and retrieve a list of 'good' columns provided there.
+        Columns of each level are served from the snapshot bundled with the component. When the level is missing
+        in the snapshot or the snapshot is outdated, they are retrieved from the API
+        (see `column_catalog.fetch_available_columns`).
 
         Returns:
              List of all available columns
         """
+        level = self.configuration.parameters.get('report_specification', {}).get('level', '')
+
+        all_items = snapshot_columns(level)
+        if not all_items:
+            all_items = fetch_available_columns(self.client, self._any_account_id(), level)
+
+        to_remove = ['OUTBOUND_CTR', 'COST_PER_OUTBOUND_CLICK', 'EENGAGEMENT_RATE',
+                     'ADVERTISER_ID', 'AD_ID', 'PAID_IMPRESSION', 'AD_NAME', 'AD_ACCOUNT_ID']
+
+        if level in ('CAMPAIGN_TARGETING', 'AD_GROUP_TARGETING', 'PIN_PROMOTION_TARGETING',
+                     'PRODUCT_GROUP_TARGETING', 'KEYWORD'):
+            to_remove.extend(['TOTAL_IMPRESSION_USER', 'TOTAL_IMPRESSION_FREQUENCY'])
+
+        if level == 'PRODUCT_GROUP_TARGETING':
+            to_remove.extend(['OUTBOUND_CTR', 'COST_PER_OUTBOUND_CLICK'])
+
+        items = [item for item in all_items if item not in to_remove]
+
+        result = [SelectElement(value=item, label=item) for item in items]
+        return result
+
+    def _any_account_id(self) -> str:
+        """Return the first configured account or the first account the client has access to"""
         account_id = None
         accounts = self.configuration.parameters.get('accounts')
         if accounts:
@@ -282,49 +1177,7 @@ class Component(ComponentBase):
                 account_id = accounts[0]['id']
         if not account_id:
             raise UserException('It was not possible to find usable account_id')
-
-        level = self.configuration.parameters.get('report_specification', {}).get('level', '')
-
-        start_date = (datetime.date.today() - datetime.timedelta(days=30)).strftime('%Y-%m-%d')
-        end_date = (datetime.date.today() - datetime.timedelta(days=2)).strftime('%Y-%m-%d')
-        fake_body = {'start_date': start_date, 'end_date': end_date, 'granularity': 'DAY',
-                     'click_window_days': 7,
-                     'engagement_window_days': 7,
-                     'view_window_days': 7,
-                     'conversion_report_time': 'TIME_OF_AD_ACTION',
-                     'columns': ['NONSENSE_XXXXXX'],
-                     'level': level,
-                     'report_format': 'CSV'}
-
-        try:
-            self.client.create_report(account_id=account_id, body=fake_body)
-        except UserException as ex:
-            key = "'NONSENSE_XXXXXX' is not one of ['"
-            s = str(ex)
-            start = s.find(key)
-            if start < 0:
-                raise ex
-            s = s[start + len(key):]
-            end = s.find("']")
-            s = s[:end]
-
-            all_items = s.split("', '")
-            to_remove = ['OUTBOUND_CTR', 'COST_PER_OUTBOUND_CLICK', 'EENGAGEMENT_RATE',
-                         'ADVERTISER_ID', 'AD_ID', 'PAID_IMPRESSION', 'AD_NAME', 'AD_ACCOUNT_ID']
-
-            if level in ('CAMPAIGN_TARGETING', 'AD_GROUP_TARGETING', 'PIN_PROMOTION_TARGETING',
-                         'PRODUCT_GROUP_TARGETING', 'KEYWORD'):
-                to_remove.extend(['TOTAL_IMPRESSION_USER', 'TOTAL_IMPRESSION_FREQUENCY'])
-
-            if level == 'PRODUCT_GROUP_TARGETING':
-                to_remove.extend(['OUTBOUND_CTR', 'COST_PER_OUTBOUND_CLICK'])
-
-            items = [item for item in all_items if item not in to_remove]
-
-            result = [SelectElement(value=item, label=item) for item in items]
-            return result
-
-        raise UserException('Failed to generate list of columns')
+        return account_id
 
 
 """
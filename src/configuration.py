@@ -72,6 +72,12 @@ class ConversionReportTimeEnum(Enum):
 class Destination:
     table_name: str
     incremental_loading: bool = True
+    slice_max_rows: int = 0
+    slice_max_mb: int = 0
+    compress: bool = False
+    column_types: bool = False
+    parquet_export: bool = False
+    deduplicate: bool = False
 
 
 @dataclass
@@ -79,6 +85,8 @@ class TimeRange:
     granularity: GranularityEnum
     date_from: str = ""
     date_to: str = ""
+    incremental_state: bool = False
+    lookback_days: int = 0
 
 
 @dataclass
@@ -101,6 +109,30 @@ class ReportSettings:
         return self.conversion_window.split('/')[2]
 
 
+@dataclass
+class ReportDefinition:
+    destination: Destination
+    input_variant: str = "report_specification"
+    report_specification: ReportSettings = field(default_factory=lambda: ConfigTree({}))
+    existing_report_ids: list[str] = field(default_factory=lambda: ConfigTree({}))
+
+
+@dataclass
+class AdvancedSettings:
+    max_concurrency: int = 10
+    max_poll_interval: int = 60
+    download_workers: int = 4
+    streaming_ingest: bool = False
+    max_days_per_report: int = 0
+    report_cache_ttl: int = 0
+    async_mode: bool = False
+    combine_engine: str = "blocks"
+    campaigns_per_report: int = 0
+    sync_analytics: bool = False
+    # local runs only (not in the row schema), the platform keeps the state of successful jobs only
+    resume_interrupted_runs: bool = False
+
+
 class ConfigurationBase:
 
     @staticmethod
@@ -130,9 +162,12 @@ class ConfigurationBase:
 @dataclass
 class Configuration(ConfigurationBase):
     input_variant: str
-    accounts: list[str]
     destination: Destination
     time_range: TimeRange
+    accounts: list[str] = field(default_factory=list)
+    all_accounts: bool = False
     report_specification: ReportSettings = field(default_factory=lambda: ConfigTree({}))
     existing_report_ids: list[str] = field(default_factory=lambda: ConfigTree({}))
+    additional_reports: list[ReportDefinition] = field(default_factory=list)
+    advanced: AdvancedSettings = field(default_factory=AdvancedSettings)
     debug: bool = False
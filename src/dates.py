@@ -0,0 +1,61 @@
+import calendar
+import datetime
+import re
+
+from keboola.component.exceptions import UserException
+
+_RELATIVE = re.compile(r'^(\d+|an?)\s+(day|week|month|year)s?\s+ago$')
+_DAYS_BACK = {'today': 0, 'now': 0, 'yesterday': 1}
+
+
+def _months_back(date: datetime.date, months: int) -> datetime.date:
+    year, month = divmod(date.year * 12 + date.month - 1 - months, 12)
+    return datetime.date(year, month + 1, min(date.day, calendar.monthrange(year, month + 1)[1]))
+
+
+def parse_native(value: str, today: datetime.date = None):
+    """Parse the common date formats without dateparser
+
+    Supported are ISO dates (YYYY-MM-DD, optionally followed by time), 'today', 'now', 'yesterday'
+    and 'N days / weeks / months / years ago'.
+
+    Returns:
+        Parsed date, None when the format is not supported
+    """
+    text = value.strip().lower()
+    today = today or datetime.date.today()
+    try:
+        return datetime.date.fromisoformat(text[:10]) if len(text) == 10 else \
+            datetime.datetime.fromisoformat(text).date()
+    except ValueError:
+        pass
+    if text in _DAYS_BACK:
+        return today - datetime.timedelta(days=_DAYS_BACK[text])
+    match = _RELATIVE.match(text)
+    if not match:
+        return None
+    count = 1 if match.group(1) in ('a', 'an') else int(match.group(1))
+    unit = match.group(2)
+    if unit == 'day':
+        return today - datetime.timedelta(days=count)
+    if unit == 'week':
+        return today - datetime.timedelta(weeks=count)
+    return _months_back(today, count * 12 if unit == 'year' else count)
+
+
+def parse_date(value: str) -> datetime.date:
+    """Parse absolute or relative date of the configuration
+
+    Common formats are parsed natively (see `parse_native`), dateparser is imported only for the other ones.
+
+    Raises:
+        UserException: When the value can't be parsed
+    """
+    date = parse_native(value)
+    if date:
+        return date
+    import dateparser
+    parsed = dateparser.parse(value)
+    if not parsed:
+        raise UserException(f'Invalid date "{value}", use YYYY-MM-DD format or a relative date, e.g. "7 days ago".')
+    return parsed.date()
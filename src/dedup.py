@@ -0,0 +1,107 @@
+import csv
+import logging
+import os
+import shutil
+import tempfile
+from typing import Iterable
+
+from output_writer import read_table_rows
+
+PARTITION_BYTES = 64 * 1024 * 1024
+# gzipped slices are estimated to take this many times more space when uncompressed
+GZIP_RATIO = 5
+
+
+def partition_count(paths: list, partition_bytes: int = PARTITION_BYTES) -> int:
+    """Number of partitions needed so that a single partition fits into `partition_bytes` (estimated)"""
+    size = sum(os.path.getsize(path) * (GZIP_RATIO if path.endswith('.gz') else 1) for path in paths)
+    return max(1, -(-size // partition_bytes))
+
+
+class Deduplicator:
+    """Removes rows with duplicate primary key, the last occurrence of each key is kept
+
+    Rows are spread into partition files on disk by hash of their key, each partition is then deduplicated
+    separately in memory. Memory use is thus bounded by size of a single partition no matter how large the table is.
+    A single partition is deduplicated in memory directly without any temporary files.
+    """
+
+    def __init__(self, key_indexes: list, partitions: int = 1, work_dir: str = None):
+        """
+        Args:
+            key_indexes: Positions of the primary key columns in a row
+            partitions: Number of partitions, see `partition_count`
+            work_dir: Folder of the temporary partition files (system temporary folder by default)
+        """
+        self.key_indexes = key_indexes
+        self.partitions = partitions
+        self.work_dir = work_dir
+        self.rows_in = 0
+        self.rows_out = 0
+
+    def _key(self, row: list) -> tuple:
+        return tuple(row[index] if index < len(row) else '' for index in self.key_indexes)
+
+    def _unique_rows(self, rows: Iterable[list]):
+        latest = {}
+        for row in rows:
+            self.rows_in += 1
+            key = self._key(row)
+            # re-inserted so that the row takes place of the last occurrence
+            latest.pop(key, None)
+            latest[key] = row
+        self.rows_out += len(latest)
+        yield from latest.values()
+
+    def _spill(self, rows: Iterable[list], folder: str) -> list:
+        paths = [os.path.join(folder, f'partition_{index:04d}.csv') for index in range(self.partitions)]
+        files = [open(path, mode='wt', encoding='utf-8', newline='') for path in paths]
+        try:
+            writers = [csv.writer(file) for file in files]
+            for row in rows:
+                writers[hash(self._key(row)) % self.partitions].writerow(row)
+        finally:
+            for file in files:
+                file.close()
+        return paths
+
+    def deduplicate(self, rows: Iterable[list]):
+        """Unique rows in the order of the last occurrence of their key (within a partition)
+
+        Args:
+            rows: Rows in order of their versions, later rows replace earlier ones
+
+        Yields:
+            Deduplicated rows
+        """
+        if self.partitions <= 1:
+            yield from self._unique_rows(rows)
+            return
+        folder = tempfile.mkdtemp(prefix='dedup_', dir=self.work_dir)
+        try:
+            for path in self._spill(rows, folder):
+                yield from self._unique_rows(read_table_rows([path]))
+                os.remove(path)
+        finally:
+            shutil.rmtree(folder, ignore_errors=True)
+
+
+def deduplicate_slices(paths: list, key_indexes: list, writer, partition_bytes: int = PARTITION_BYTES,
+                       work_dir: str = None) -> Deduplicator:
+    """Write rows of output table slices without duplicate primary keys
+
+    Args:
+        paths: Slices of the table in order of their versions (later slices replace earlier ones)
+        key_indexes: Positions of the primary key columns
+        writer: csv writer or SliceWriter of the deduplicated table
+        partition_bytes: Maximum estimated size of a partition deduplicated in memory
+        work_dir: Folder of the temporary partition files
+
+    Returns:
+        Deduplicator with number of input and output rows
+    """
+    deduplicator = Deduplicator(key_indexes, partition_count(paths, partition_bytes), work_dir)
+    logging.debug(f'Deduplicating {len(paths)} slices in {deduplicator.partitions} partitions.')
+    for row in deduplicator.deduplicate(read_table_rows(paths)):
+        writer.writerow(row)
+    return deduplicator
@@ -0,0 +1,153 @@
+import contextlib
+import io
+import logging
+import threading
+import time
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+from typing import Callable
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
+
+DOWNLOAD_TIMEOUT = 180
+MIN_CHUNK_SIZE = 64 * 1024
+MAX_CHUNK_SIZE = 4 * 1024 * 1024
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+
+def chunk_size_for(content_length) -> int:
+    """Pick read buffer size based on size of the downloaded content (about 1/16 of it within limits)"""
+    try:
+        length = int(content_length)
+    except (TypeError, ValueError):
+        return DEFAULT_CHUNK_SIZE
+    return max(MIN_CHUNK_SIZE, min(MAX_CHUNK_SIZE, length // 16))
+
+
+def bytes_read(text_stream) -> int:
+    """Number of bytes received so far by a text stream opened by `DownloadSession.open_text`"""
+    return text_stream.buffer.raw.tell()
+
+
+class DownloadSession:
+    """HTTP session shared by all report downloads
+
+    Connections are kept alive and reused by the download workers, transfer compression is requested
+    and read buffers are sized according to the content length. Amount of downloaded data and time spent
+    downloading are collected for throughput reporting.
+    """
+
+    def __init__(self, pool_size: int = 4, max_retries: int = 5):
+        """
+        Args:
+            pool_size: Maximum number of connections kept open, should match number of download workers
+            max_retries: Number of retries of failed connections or 5xx responses
+        """
+        self.session = requests.Session()
+        retry = Retry(total=max_retries, backoff_factor=0.5, status_forcelist=(500, 502, 503, 504))
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers['Accept-Encoding'] = 'gzip, deflate'
+        self._lock = threading.Lock()
+        self.files = 0
+        self.bytes = 0
+        self.seconds = 0.0
+
+    def _record(self, url: str, size: int, started: float):
+        elapsed = time.monotonic() - started
+        with self._lock:
+            self.files += 1
+            self.bytes += size
+            self.seconds += elapsed
+        logging.debug(f'Downloaded {size / 1e6:.1f} MB in {elapsed:.1f} s from {url.split("?")[0]}')
+
+    def download(self, url: str, result_file_path: str) -> int:
+        """Download content of the URL into a file
+
+        Returns:
+            Number of bytes written
+        """
+        started = time.monotonic()
+        size = 0
+        with self.session.get(url, stream=True, timeout=DOWNLOAD_TIMEOUT) as res:
+            res.raise_for_status()
+            chunk_size = chunk_size_for(res.headers.get('Content-Length'))
+            with open(result_file_path, 'wb') as out:
+                for chunk in res.iter_content(chunk_size=chunk_size):
+                    out.write(chunk)
+                    size += len(chunk)
+        self._record(url, size, started)
+        return size
+
+    @contextlib.contextmanager
+    def open_text(self, url: str, encoding: str = 'utf-8'):
+        """Open content of the URL as a text stream, the content is consumed while it is being read"""
+        started = time.monotonic()
+        with self.session.get(url, stream=True, timeout=DOWNLOAD_TIMEOUT) as res:
+            res.raise_for_status()
+            res.raw.decode_content = True
+            # buffered reader must not read from a response closed by urllib3 at the end of the content
+            res.raw.auto_close = False
+            buffered = io.BufferedReader(res.raw, buffer_size=chunk_size_for(res.headers.get('Content-Length')))
+            with io.TextIOWrapper(buffered, encoding=encoding, newline='') as text:
+                yield text
+            self._record(url, res.raw.tell(), started)
+
+    def log_statistics(self):
+        if self.files:
+            throughput = self.bytes / self.seconds / 1e6 if self.seconds else 0
+            logging.info(f'Downloaded {self.files} reports, {self.bytes / 1e6:.1f} MB in total '
+                         f'({throughput:.1f} MB/s per download).')
+
+    def close(self):
+        self.session.close()
+
+
+class DownloadQueue:
+    """Runs report downloads in a bounded pool of background workers
+
+    Downloads are queued as soon as reports are finished so that status polling of other reports
+    is not blocked by long running downloads. Failure of any download is re-raised in the calling thread
+    either on the next `raise_for_failures` call or when the queue is joined.
+    """
+
+    def __init__(self, download_function: Callable, max_workers: int = 4):
+        """
+        Args:
+            download_function: Function called by the workers with arguments passed to `submit`
+            max_workers: Maximum number of concurrent downloads
+        """
+        self._download_function = download_function
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix='download')
+        self._futures = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._executor.shutdown(wait=True, cancel_futures=exc_type is not None)
+
+    def submit(self, *args, **kwargs):
+        """Queue a download"""
+        self._futures.append(self._executor.submit(self._download_function, *args, **kwargs))
+
+    def raise_for_failures(self):
+        """Re-raise exception of the first failed download (if any)"""
+        for future in self._futures:
+            if future.done() and future.exception():
+                raise future.exception()
+
+    def join(self) -> list:
+        """Wait for all queued downloads
+
+        Returns:
+            List of download function results in order of submission
+
+        Raises:
+            Exception of the first failed download
+        """
+        wait(self._futures, return_when=FIRST_EXCEPTION)
+        self.raise_for_failures()
+        return [future.result() for future in self._futures]
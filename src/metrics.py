@@ -0,0 +1,58 @@
+import contextlib
+import threading
+import time
+
+
+class RunMetrics:
+    """Collects durations and volumes of the extraction phases
+
+    Phases (authorization, report creation, report generation, download, combine ...) accumulate
+    total duration and number of occurrences. Values related to a single report (bytes, rows, durations)
+    are collected per report key. All methods are thread safe.
+    """
+
+    def __init__(self, clock=time.monotonic):
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._started = clock()
+        self.phases = {}
+        self.reports = {}
+        self.counters = {}
+
+    @contextlib.contextmanager
+    def phase(self, name: str, report_key: str = None):
+        """Measure duration of the block as a phase (and a value of the report when key is given)"""
+        started = self._clock()
+        try:
+            yield
+        finally:
+            self.add_time(name, self._clock() - started, report_key)
+
+    def add_time(self, name: str, seconds: float, report_key: str = None):
+        with self._lock:
+            phase = self.phases.setdefault(name, dict(seconds=0.0, count=0))
+            phase['seconds'] += seconds
+            phase['count'] += 1
+        if report_key is not None:
+            self.add_report_values(report_key, **{f'{name}_seconds': seconds})
+
+    def add_report_values(self, report_key: str, **values):
+        """Add numeric values (bytes, rows, ...) to the report metrics"""
+        with self._lock:
+            report = self.reports.setdefault(report_key, {})
+            for name, value in values.items():
+                report[name] = report.get(name, 0) + value
+
+    def increment(self, name: str, value: float = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def to_dict(self) -> dict:
+        """Structured metrics of the run with durations rounded to milliseconds"""
+        with self._lock:
+            return dict(total_seconds=round(self._clock() - self._started, 3),
+                        phases={name: dict(seconds=round(phase['seconds'], 3), count=phase['count'])
+                                for name, phase in self.phases.items()},
+                        counters=dict(self.counters),
+                        reports={key: {name: round(value, 3) for name, value in values.items()}
+                                 for key, values in self.reports.items()})
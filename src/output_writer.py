@@ -0,0 +1,333 @@
+import csv
+import gzip
+import importlib.util
+import io
+import logging
+import os
+import re
+import threading
+from typing import BinaryIO, Iterable, Iterator, TextIO
+
+from keboola.component.exceptions import UserException
+
+
+BLOCK_SIZE = 4 * 1024 * 1024
+ENGINE_CSV = 'csv'
+ENGINE_BLOCKS = 'blocks'
+ENGINE_VECTORIZED = 'vectorized'
+
+
+class SharedHeader:
+    """Header shared by all reports written into a single destination table
+
+    The first report sets the header, all following reports must have the same one.
+    The check is thread safe so it may be used by concurrent download workers.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.columns = None
+
+    def check(self, fields: list):
+        """Register header of a report
+
+        Args:
+            fields: Header of a report
+
+        Raises:
+            UserException: When the header does not match header of previously registered reports
+        """
+        if fields is None:
+            # empty report without any header
+            return
+        with self._lock:
+            if not self.columns:
+                self.columns = fields
+                return
+        if fields != self.columns:
+            mm = ''
+            for a, b in zip(fields, self.columns):
+                if a != b:
+                    mm = f'{a}/{b}'
+                    break
+            raise UserException(f'Headers of reports do not match: {mm}')
+
+
+class SliceWriter:
+    """Writes rows of a single report into slices of a sliced output table
+
+    A new slice is started when the current one reaches `max_rows` rows or `max_bytes` bytes
+    (size of the file on disk, i.e. compressed size for gzipped slices). Without any limit all rows
+    are written into a single `<name>.csv` file. Slices are optionally gzipped while being written.
+    """
+
+    SIZE_CHECK_ROWS = 1000
+
+    def __init__(self, directory: str, name: str, max_rows: int = 0, max_bytes: int = 0, compress: bool = False):
+        """
+        Args:
+            directory: Folder of the sliced table
+            name: Base name of the slices
+            max_rows: Maximum number of rows in a slice, 0 means unlimited
+            max_bytes: Maximum size of a slice in bytes, 0 means unlimited
+            compress: Gzip the slices
+        """
+        self.directory = directory
+        self.name = name
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.compress = compress
+        self.paths = []
+        self._file = None
+        self._binary = None
+        self._stream = None
+        self._writer = None
+        self._slice_rows = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _slice_path(self) -> str:
+        suffix = '.csv.gz' if self.compress else '.csv'
+        if self.max_rows or self.max_bytes:
+            return os.path.join(self.directory, f'{self.name}_{len(self.paths):04d}{suffix}')
+        return os.path.join(self.directory, f'{self.name}{suffix}')
+
+    def _open_slice(self):
+        path = self._slice_path()
+        self.paths.append(path)
+        self._binary = open(path, mode='wb')
+        self._stream = gzip.GzipFile(fileobj=self._binary, mode='wb', compresslevel=6) if self.compress \
+            else self._binary
+        self._file = io.TextIOWrapper(self._stream, encoding='utf-8', newline='')
+        self._writer = csv.writer(self._file)
+        self._slice_rows = 0
+
+    def _slice_full(self) -> bool:
+        if self.max_rows and self._slice_rows >= self.max_rows:
+            return True
+        if self.max_bytes and self._slice_rows % self.SIZE_CHECK_ROWS == 0:
+            self._file.flush()
+            return self._binary.tell() >= self.max_bytes
+        return False
+
+    def writerow(self, row: list):
+        if self._writer is None:
+            self._open_slice()
+        elif self._slice_full():
+            self.close()
+            self._open_slice()
+        self._writer.writerow(row)
+        self._slice_rows += 1
+
+    def write_block(self, data: bytes, rows: int, at_boundary: bool = True):
+        """Write a block of already formatted CSV records (see `prefix_records`)
+
+        Slices are rolled over by size only between blocks ending at a record boundary, so a slice may exceed
+        `max_bytes` by up to one block. Row limit is not supported - use `writerow` when `max_rows` is set.
+
+        Args:
+            data: UTF-8 encoded CSV records
+            rows: Number of records started in the block
+            at_boundary: Whether the block ends at a record boundary
+        """
+        if self._writer is None:
+            self._open_slice()
+        self._file.flush()
+        self._stream.write(data)
+        self._slice_rows += rows
+        if at_boundary and self.max_bytes and self._binary.tell() >= self.max_bytes:
+            self.close()
+
+    def close(self):
+        if not self.paths:
+            # report without any rows still produces an (empty) slice
+            self._open_slice()
+        if self._file:
+            self._file.close()
+            self._binary.close()
+            self._file = self._binary = self._stream = self._writer = None
+
+
+def report_slices(directory: str, name: str) -> list:
+    """Paths of slices written by `SliceWriter` of the given name into the directory, in order of writing"""
+    pattern = re.compile(re.escape(name) + r'(_\d{4})?\.csv(\.gz)?')
+    return [os.path.join(directory, file_name) for file_name in sorted(os.listdir(directory))
+            if pattern.fullmatch(file_name)]
+
+
+def read_table_rows(paths: Iterable[str]) -> Iterator[list]:
+    """Rows of output table slices (headerless, optionally gzipped CSV files)"""
+    for path in paths:
+        with open(path, mode='rb') as binary:
+            stream = gzip.GzipFile(fileobj=binary, mode='rb') if path.endswith('.gz') else binary
+            with io.TextIOWrapper(stream, encoding='utf-8', newline='') as in_file:
+                yield from csv.reader(in_file)
+
+
+def write_rows_with_account(rows: Iterable[list], writer, account_id: str) -> int:
+    """Write report rows into destination table with account ID prepended as the first column
+
+    Args:
+        rows: Parsed report rows (without header)
+        writer: csv writer or SliceWriter of the destination table
+        account_id: Value of the Account_ID column
+
+    Returns:
+        Number of rows written
+    """
+    count = 0
+    for row in rows:
+        row.insert(0, account_id)
+        writer.writerow(row)
+        count += 1
+    return count
+
+
+def ingest_report_stream(in_file: TextIO, writer, account_id: str, header: SharedHeader) -> int:
+    """Validate report header and write its rows into destination table in a single pass
+
+    Args:
+        in_file: Report content (CSV with header) - typically decoded HTTP response stream
+        writer: csv writer or SliceWriter of the destination table
+        account_id: Value of the Account_ID column
+        header: Header shared by all reports of the destination table
+
+    Returns:
+        Number of rows written
+
+    Raises:
+        UserException: When the header does not match header of other reports
+    """
+    reader = csv.reader(in_file)
+    fields = next(reader, None)
+    header.check(fields)
+    return write_rows_with_account(reader, writer, account_id)
+
+
+def quoted_prefix(account_id: str) -> bytes:
+    """Account_ID column value (quoted) followed by the delimiter, as prepended to each record"""
+    return ('"' + account_id.replace('"', '""') + '",').encode('utf-8')
+
+
+def _prefix_block_python(data: bytes, prefix: bytes, in_quotes: bool) -> tuple:
+    """Insert prefix after each newline outside quoted fields
+
+    The block is split on quote characters - parts alternate between outside and inside of quoted fields
+    (escaped quotes produce an empty part, which keeps the alternation), so only the outside parts are searched
+    for newlines.
+
+    Returns:
+        tuple: Prefixed block, number of inserted prefixes, whether the block ends inside a quoted field
+    """
+    parts = data.split(b'"')
+    rows = 0
+    separator = b'\n' + prefix
+    for i in range(1 if in_quotes else 0, len(parts), 2):
+        count = parts[i].count(b'\n')
+        if count:
+            parts[i] = parts[i].replace(b'\n', separator)
+            rows += count
+    return b'"'.join(parts), rows, in_quotes != (len(parts) % 2 == 0)
+
+
+def _prefix_block_vectorized(data: bytes, prefix: bytes, in_quotes: bool) -> tuple:
+    """Vectorized variant of `_prefix_block_python` using numpy"""
+    import numpy
+    array = numpy.frombuffer(data, dtype=numpy.uint8)
+    quotes = numpy.cumsum(array == ord('"'), dtype=numpy.int64)
+    ends_in_quotes = in_quotes != bool(quotes[-1] & 1)
+    outside = (quotes & 1) == (1 if in_quotes else 0)
+    positions = numpy.flatnonzero((array == ord('\n')) & outside) + 1
+    if not len(positions):
+        return data, 0, ends_in_quotes
+    prefix_array = numpy.frombuffer(prefix, dtype=numpy.uint8)
+    result = numpy.insert(array, numpy.repeat(positions, len(prefix_array)), numpy.tile(prefix_array, len(positions)))
+    return result.tobytes(), len(positions), ends_in_quotes
+
+
+def prefix_records(in_file: BinaryIO, prefix: bytes, block_size: int = BLOCK_SIZE,
+                   engine: str = ENGINE_BLOCKS) -> Iterator[tuple]:
+    """Prepend prefix to each CSV record of a binary stream without parsing the records
+
+    The stream is processed in blocks cut at the last newline. Quote state is carried over between blocks,
+    so newlines embedded in quoted fields are never treated as record boundaries.
+
+    Args:
+        in_file: CSV records (without header) opened in binary mode
+        prefix: Bytes to prepend to each record (see `quoted_prefix`)
+        block_size: Number of bytes read at once
+        engine: ENGINE_BLOCKS (pure Python) or ENGINE_VECTORIZED (numpy)
+
+    Yields:
+        tuple: Block of prefixed records, number of records started in the block, whether the block ends
+            at a record boundary
+    """
+    prefix_block = _prefix_block_vectorized if engine == ENGINE_VECTORIZED else _prefix_block_python
+    in_quotes = False
+    remainder = b''
+    record_start = True
+    while True:
+        data = in_file.read(block_size)
+        if data:
+            data = remainder + data
+            cut = data.rfind(b'\n') + 1
+            if not cut:
+                remainder = data
+                continue
+            data, remainder = data[:cut], data[cut:]
+        else:
+            data, remainder = remainder, b''
+            if not data:
+                return
+        block, rows, in_quotes = prefix_block(data, prefix, in_quotes)
+        if record_start:
+            block = prefix + block
+            rows += 1
+        # prefix inserted after the final newline belongs to a record of the next block (if there is any)
+        record_start = not in_quotes and block.endswith(b'\n' + prefix)
+        if record_start:
+            block = block[:-len(prefix)]
+            rows -= 1
+        yield block, rows, record_start
+
+
+def numpy_installed() -> bool:
+    """Whether numpy (optional dependency of the vectorized combine engine) is available, without importing it"""
+    return importlib.util.find_spec('numpy') is not None
+
+
+def combine_engine(name: str) -> str:
+    """Resolve configured combine engine, vectorized engine falls back to blocks when numpy is not installed"""
+    if name == ENGINE_VECTORIZED and not numpy_installed():
+        logging.warning('The vectorized combine engine requires numpy, which is not installed. '
+                        'Falling back to the blocks engine.')
+        return ENGINE_BLOCKS
+    if name not in (ENGINE_CSV, ENGINE_BLOCKS, ENGINE_VECTORIZED):
+        raise UserException(f'Unknown combine engine {name}, use one of: '
+                            f'{ENGINE_CSV}, {ENGINE_BLOCKS}, {ENGINE_VECTORIZED}')
+    return name
+
+
+def write_blocks_with_account(in_file: BinaryIO, writer: SliceWriter, account_id: str,
+                              engine: str = ENGINE_BLOCKS, block_size: int = BLOCK_SIZE) -> int:
+    """Byte block counterpart of `write_rows_with_account`
+
+    Args:
+        in_file: Report records (without header) opened in binary mode
+        writer: SliceWriter of the destination table
+        account_id: Value of the Account_ID column
+        engine: ENGINE_BLOCKS or ENGINE_VECTORIZED
+        block_size: Number of bytes read at once
+
+    Returns:
+        Number of rows written
+    """
+    count = 0
+    for block, rows, at_boundary in prefix_records(in_file, quoted_prefix(account_id), block_size, engine):
+        writer.write_block(block, rows, at_boundary)
+        count += rows
+    return count
@@ -0,0 +1,115 @@
+import heapq
+import random
+import time
+
+FIRST_PROBE_DELAY = 2.0
+INITIAL_DELAY = 5.0
+MAX_DELAY = 60.0
+BACKOFF_FACTOR = 1.5
+JITTER = 0.2
+MAX_REQUESTS_PER_SECOND = 5.0
+
+
+class PollingScheduler:
+    """Schedules report status checks
+
+    Every report is tracked separately. The first status check is done shortly after the report is added,
+    following checks are delayed using exponential backoff with jitter, so that small reports are picked up
+    quickly while long-running reports are not polled needlessly. Overall rate of status checks is capped
+    by `max_requests_per_second`.
+
+    Usage:
+        scheduler.add(token, report)
+        while scheduler:
+            token, report = scheduler.next_due()
+            ... check status ...
+            scheduler.reschedule(token) or scheduler.complete(token)
+    """
+
+    def __init__(self, first_probe_delay: float = FIRST_PROBE_DELAY, initial_delay: float = INITIAL_DELAY,
+                 max_delay: float = MAX_DELAY, backoff_factor: float = BACKOFF_FACTOR, jitter: float = JITTER,
+                 max_requests_per_second: float = MAX_REQUESTS_PER_SECOND,
+                 clock=time.monotonic, sleep=time.sleep, rng: random.Random = None):
+        """
+        Args:
+            first_probe_delay: Delay of the first status check after the report was added [s]
+            initial_delay: Delay after the first unsuccessful status check [s]
+            max_delay: Upper limit of the delay between two status checks of a single report [s]
+            backoff_factor: Multiplier applied to the delay after each unsuccessful status check
+            jitter: Fraction of the delay that is randomly subtracted to spread the checks in time
+            max_requests_per_second: Overall limit of status checks; 0 disables the limit
+            clock: Monotonic time source
+            sleep: Function used for waiting
+            rng: Random generator used for jitter
+        """
+        self.first_probe_delay = first_probe_delay
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.backoff_factor = backoff_factor
+        self.jitter = jitter
+        self.min_interval = 1 / max_requests_per_second if max_requests_per_second else 0
+        self._clock = clock
+        self._sleep = sleep
+        self._rng = rng or random.Random()
+        self._queue = []
+        self._items = {}
+        self._stats = {}
+        self._sequence = 0
+        self._last_request = None
+
+    def __len__(self):
+        return len(self._items)
+
+    def add(self, key: str, item):
+        """Start tracking an item, its first status check is planned after `first_probe_delay`"""
+        now = self._clock()
+        self._items[key] = item
+        self._stats[key] = dict(poll_count=0, added=now, finished=None)
+        self._push(key, now + self.first_probe_delay)
+
+    def next_due(self) -> tuple:
+        """Wait until status of some item should be checked
+
+        Returns:
+            tuple: key and item to be checked
+        """
+        while True:
+            due, _, key = heapq.heappop(self._queue)
+            if key in self._items:
+                break
+        start = max(due, self._last_request + self.min_interval) if self._last_request is not None else due
+        now = self._clock()
+        if start > now:
+            self._sleep(start - now)
+        self._last_request = self._clock()
+        self._stats[key]['poll_count'] += 1
+        return key, self._items[key]
+
+    def reschedule(self, key: str):
+        """Plan next status check of an item which has not finished yet"""
+        self._push(key, self._clock() + self.delay(self._stats[key]['poll_count']))
+
+    def delay(self, poll_count: int) -> float:
+        """Delay of the next status check after `poll_count` unsuccessful checks (including jitter)"""
+        delay = min(self.max_delay, self.initial_delay * self.backoff_factor ** (poll_count - 1))
+        return delay * (1 - self.jitter * self._rng.random())
+
+    def complete(self, key: str):
+        """Stop tracking an item"""
+        self._items.pop(key)
+        self._stats[key]['finished'] = self._clock()
+
+    def statistics(self, key: str) -> dict:
+        """Polling statistics of an item
+
+        Returns:
+            dict: 'poll_count' - number of status checks, 'wait_time' - seconds since the item was added
+                until it was completed (or until now when still running)
+        """
+        stats = self._stats[key]
+        end = stats['finished'] if stats['finished'] is not None else self._clock()
+        return dict(poll_count=stats['poll_count'], wait_time=end - stats['added'])
+
+    def _push(self, key: str, due: float):
+        self._sequence += 1
+        heapq.heappush(self._queue, (due, self._sequence, key))
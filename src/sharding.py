@@ -0,0 +1,73 @@
+import datetime
+
+DATE_FORMAT = '%Y-%m-%d'
+
+
+def _add_months(date: datetime.date, months: int) -> datetime.date:
+    month = date.month - 1 + months
+    return datetime.date(date.year + month // 12, month % 12 + 1, 1)
+
+
+def align_start_date(date: datetime.date, granularity: str) -> datetime.date:
+    """Move date to the beginning of the time bucket it belongs to (Monday for WEEK, first day for MONTH)"""
+    if granularity == 'WEEK':
+        return date - datetime.timedelta(days=date.weekday())
+    if granularity == 'MONTH':
+        return date.replace(day=1)
+    return date
+
+
+def shard_date_range(start_date: str, end_date: str, granularity: str, max_days: int) -> list:
+    """Split time range into consecutive windows
+
+    Windows are aligned to the granularity so that no time bucket is split between two reports
+    (weeks start on Monday, months on the first day of month). TOTAL granularity can't be split
+    because totals of separate windows can't be merged.
+
+    Args:
+        start_date: First day of the range (YYYY-MM-DD)
+        end_date: Last day of the range (YYYY-MM-DD), inclusive
+        granularity: Report granularity (TOTAL, DAY, HOUR, WEEK, MONTH)
+        max_days: Maximum number of days in a single window, 0 disables splitting
+
+    Returns:
+        List of (start_date, end_date) tuples of strings in YYYY-MM-DD format
+    """
+    if max_days <= 0 or granularity == 'TOTAL':
+        return [(start_date, end_date)]
+
+    start = datetime.datetime.strptime(start_date, DATE_FORMAT).date()
+    end = datetime.datetime.strptime(end_date, DATE_FORMAT).date()
+
+    windows = []
+    window_start = start
+    while window_start <= end:
+        if granularity == 'MONTH':
+            next_start = _add_months(window_start, max(1, max_days // 30))
+        elif granularity == 'WEEK':
+            next_start = align_start_date(window_start, granularity) + datetime.timedelta(weeks=max(1, max_days // 7))
+        else:
+            next_start = window_start + datetime.timedelta(days=max_days)
+        window_end = min(end, next_start - datetime.timedelta(days=1))
+        windows.append((window_start.strftime(DATE_FORMAT), window_end.strftime(DATE_FORMAT)))
+        window_start = next_start
+    return windows
+
+
+def shard_entities(entity_ids: list, batch_size: int) -> list:
+    """Split entity IDs (e.g. campaigns) into batches reported separately
+
+    IDs are sorted so that the batches (and thus the report requests) do not change between runs
+    unless the entities change.
+
+    Args:
+        entity_ids: IDs of the entities
+        batch_size: Maximum number of IDs in a batch, 0 disables splitting
+
+    Returns:
+        List of ID batches, a single None (no filter) when the entities are not split
+    """
+    if batch_size <= 0 or len(entity_ids) <= batch_size:
+        return [None]
+    ids = sorted(entity_ids)
+    return [ids[index:index + batch_size] for index in range(0, len(ids), batch_size)]
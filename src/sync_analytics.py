@@ -0,0 +1,109 @@
+import datetime
+import re
+
+from sharding import DATE_FORMAT
+
+# reports up to this size are served by the synchronous analytics endpoints
+SYNC_MAX_DAYS = 7
+SYNC_MAX_COLUMNS = 20
+# synchronous analytics are available only for recent data
+SYNC_MAX_AGE_DAYS = 89
+SYNC_LEVELS = ('ADVERTISER', 'CAMPAIGN')
+# hourly data of the synchronous endpoints are large and slow, such reports are created asynchronously
+SYNC_GRANULARITIES = ('TOTAL', 'DAY')
+# maximum number of campaign IDs in a single campaign analytics request
+CAMPAIGN_BATCH_SIZE = 250
+
+CAMPAIGN_NAME = 'Campaign name'
+DIMENSION_FIELDS = {'Date': 'DATE', 'Campaign ID': 'CAMPAIGN_ID', CAMPAIGN_NAME: CAMPAIGN_NAME}
+BODY_PARAMETERS = ('start_date', 'end_date', 'granularity', 'click_window_days', 'engagement_window_days',
+                   'view_window_days', 'conversion_report_time')
+
+
+def is_small_report(body: dict, today: datetime.date = None) -> bool:
+    """Whether a custom report is small enough for the synchronous analytics endpoints
+
+    The report must cover at most `SYNC_MAX_DAYS` days of the last `SYNC_MAX_AGE_DAYS` days, request at most
+    `SYNC_MAX_COLUMNS` columns, be of `TOTAL` or `DAY` granularity and of a level supported by the synchronous
+    endpoints.
+    """
+    today = today or datetime.date.today()
+    start = datetime.datetime.strptime(body['start_date'], DATE_FORMAT).date()
+    end = datetime.datetime.strptime(body['end_date'], DATE_FORMAT).date()
+    return (body['level'] in SYNC_LEVELS
+            and body['granularity'] in SYNC_GRANULARITIES
+            and len(body['columns']) <= SYNC_MAX_COLUMNS
+            and (end - start).days < SYNC_MAX_DAYS
+            and (today - start).days <= SYNC_MAX_AGE_DAYS)
+
+
+def _normalize(name: str) -> str:
+    name = re.sub(r' \d+$', '', name.lower().replace('_', ' ').strip())
+    return name[:-1] if name.endswith('s') else name
+
+
+def column_fields(header: list, columns: list):
+    """Map columns of a report CSV header to fields of the synchronous analytics response
+
+    Dimensions are mapped by their names, metrics by comparing the header name with the requested column
+    (e.g. 'Spend in dollar' is SPEND_IN_DOLLAR). The header can be mapped only when each of its columns matches
+    exactly one field and all requested columns are present.
+
+    Args:
+        header: Header of a report downloaded by a previous run
+        columns: Columns requested by the report
+
+    Returns:
+        Field of each header column, None when the header can't be mapped
+    """
+    fields = []
+    for column in header:
+        if column in DIMENSION_FIELDS:
+            fields.append(DIMENSION_FIELDS[column])
+            continue
+        matches = [code for code in columns if _normalize(code) == _normalize(column)]
+        if len(matches) != 1:
+            return None
+        fields.append(matches[0])
+    if set(columns) - set(fields):
+        return None
+    return fields
+
+
+def analytics_params(body: dict) -> dict:
+    """Query parameters of the synchronous analytics endpoints equivalent to the custom report body"""
+    params = {name: body[name] for name in BODY_PARAMETERS}
+    params['columns'] = ','.join(body['columns'])
+    return params
+
+
+def format_value(value) -> str:
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def analytics_rows(items: list, fields: list, campaign_names: dict = None) -> list:
+    """Convert synchronous analytics response into rows of the report CSV layout
+
+    Args:
+        items: Analytics response items (dictionaries by column)
+        fields: Field of each CSV column, see `column_fields`
+        campaign_names: Names of campaigns by campaign ID
+
+    Returns:
+        List of rows (without header)
+    """
+    campaign_names = campaign_names or {}
+    rows = []
+    for item in items:
+        row = []
+        for field in fields:
+            if field == CAMPAIGN_NAME:
+                row.append(campaign_names.get(str(item.get('CAMPAIGN_ID')), ''))
+            else:
+                row.append(format_value(item.get(field)))
+        rows.append(row)
+    return rows
@@ -0,0 +1,242 @@
+"""
+Local stand-in of the Pinterest API v5 used by end-to-end tests and benchmarks.
+
+Emulated endpoints:
+    POST oauth/token                                    (returns `access_token`)
+    GET  ad_accounts                                    (bookmark pagination)
+    GET  ad_accounts/<account>/templates                (bookmark pagination)
+    GET  ad_accounts/<account>/campaigns                (bookmark pagination, one campaign per report row)
+    GET  ad_accounts/<account>/campaigns/analytics      (synchronous analytics, same data as the reports)
+    POST ad_accounts/<account>/reports                  (custom report)
+    POST ad_accounts/<account>/templates/<id>/reports   (report from template)
+    GET  ad_accounts/<account>/reports?token=<token>    (IN_PROGRESS until `report_delay` passes, then FINISHED
+                                                         or FAILED in `failed_accounts`)
+    GET  files/<token>.csv                              (generated report data)
+"""
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+HEADER = ['Date', 'Campaign ID', 'Campaign name', 'Spend in dollar', 'Impressions']
+# columns accepted by custom reports, invalid column is rejected with the list of valid ones
+COLUMNS = ['SPEND_IN_DOLLAR', 'IMPRESSION_1']
+
+
+class PinterestSimulator:
+    """Pinterest API simulator running in a background thread
+
+    Usage:
+        with PinterestSimulator(accounts=50, rows_per_report=1000) as simulator:
+            client = PinterestClient(token='token', base_url=simulator.base_url)
+    """
+
+    def __init__(self, accounts: int = 1, templates_per_account: int = 1, rows_per_report: int = 100,
+                 report_delay: float = 1.0, latency: float = 0.0, rate_limit_every: int = 0, page_size: int = 50,
+                 access_token: str = None, failed_accounts: tuple = ()):
+        """
+        Args:
+            accounts: Number of ad accounts
+            templates_per_account: Number of report templates in each account
+            rows_per_report: Number of data rows in each report
+            report_delay: Seconds between report creation and the time it is FINISHED
+            latency: Seconds added to each API response
+            rate_limit_every: Every n-th API request is rejected with 429, 0 disables rate limiting
+            page_size: Maximum number of items returned by listing endpoints
+            access_token: Token issued by oauth/token, when set API requests with other tokens are rejected with 401
+            failed_accounts: Accounts whose reports end FAILED instead of FINISHED
+        """
+        self.account_ids = [str(1000 + i) for i in range(accounts)]
+        self.templates_per_account = templates_per_account
+        self.rows_per_report = rows_per_report
+        self.report_delay = report_delay
+        self.latency = latency
+        self.rate_limit_every = rate_limit_every
+        self.page_size = page_size
+        self.access_token = access_token
+        self.failed_accounts = failed_accounts
+        self.reports = {}
+        self.request_counts = {}
+        self.request_log = []
+        self.downloaded_bytes = 0
+        self._lock = threading.Lock()
+        self._api_requests = 0
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f'http://127.0.0.1:{self._server.server_port}/v5'
+
+    @property
+    def total_requests(self) -> int:
+        return sum(self.request_counts.values())
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _count(self, name: str) -> bool:
+        """Count request, return False when the request should be rejected because of rate limit"""
+        with self._lock:
+            self.request_counts[name] = self.request_counts.get(name, 0) + 1
+            self.request_log.append(name)
+            if name == 'download':
+                return True
+            self._api_requests += 1
+            return not (self.rate_limit_every and self._api_requests % self.rate_limit_every == 0)
+
+    def _create_report(self, account_id: str, start_date: str, campaign_ids: list = None) -> str:
+        token = uuid.uuid4().hex
+        with self._lock:
+            self.reports[token] = dict(account_id=account_id, created=time.monotonic(), start_date=start_date,
+                                       campaign_ids=campaign_ids)
+        return token
+
+    def _page(self, items: list, params: dict) -> dict:
+        start = int(params.get('bookmark', ['0'])[0])
+        size = min(int(params.get('page_size', [self.page_size])[0]), self.page_size)
+        bookmark = str(start + size) if start + size < len(items) else None
+        return dict(items=items[start:start + size], bookmark=bookmark)
+
+    def _report_rows(self, token: str):
+        report = self.reports[token]
+        yield ','.join(HEADER) + '\r\n'
+        for i in range(self.rows_per_report):
+            if report['campaign_ids'] is not None and str(i) not in report['campaign_ids']:
+                continue
+            yield f'{report["start_date"]},{i},"Campaign {i}, ""quoted""",{i * 0.01:.2f},{i * 10}\r\n'
+
+    def _handler_class(self):
+        simulator = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def _send_json(self, payload: dict, status: int = 200, headers: dict = None):
+                body = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _read_body(self) -> bytes:
+                length = int(self.headers.get('Content-Length') or 0)
+                return self.rfile.read(length) if length else b''
+
+            def _api(self, name: str) -> bool:
+                if simulator.latency:
+                    time.sleep(simulator.latency)
+                if simulator.access_token and name != 'oauth_token' and \
+                        self.headers.get('Authorization') != f'Bearer {simulator.access_token}':
+                    simulator._count(f'{name}_unauthorized')
+                    self._send_json({'code': 2, 'message': 'Authentication failed.'}, status=401)
+                    return False
+                if not simulator._count(name):
+                    self._send_json({'code': 8, 'message': 'Rate limit exceeded'}, status=429,
+                                    headers={'Retry-After': '1'})
+                    return False
+                return True
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                parts = url.path.strip('/').split('/')
+                params = parse_qs(url.query)
+                if parts[0] == 'files':
+                    simulator._count('download')
+                    return self._send_file(parts[1].split('.')[0])
+                if parts[1:] == ['ad_accounts']:
+                    if self._api('list_accounts'):
+                        items = [dict(id=account_id, name=f'Account {account_id}')
+                                 for account_id in simulator.account_ids]
+                        self._send_json(simulator._page(items, params))
+                elif len(parts) == 4 and parts[3] == 'templates':
+                    if self._api('list_templates'):
+                        items = [dict(id=f'{parts[2]}{i}', name=f'Template {i}', ad_account_id=parts[2])
+                                 for i in range(simulator.templates_per_account)]
+                        self._send_json(simulator._page(items, params))
+                elif len(parts) == 4 and parts[3] == 'campaigns':
+                    if self._api('list_campaigns'):
+                        items = [dict(id=str(i), name=f'Campaign {i}, "quoted"')
+                                 for i in range(simulator.rows_per_report)]
+                        self._send_json(simulator._page(items, params))
+                elif len(parts) == 5 and parts[3:] == ['campaigns', 'analytics']:
+                    if self._api('campaign_analytics'):
+                        campaign_ids = params['campaign_ids'][0].split(',')
+                        self._send_json([dict(DATE=params['start_date'][0], CAMPAIGN_ID=str(i),
+                                              SPEND_IN_DOLLAR=i * 0.01, IMPRESSION_1=i * 10)
+                                         for i in range(simulator.rows_per_report) if str(i) in campaign_ids])
+                elif len(parts) == 4 and parts[3] == 'reports':
+                    if self._api('get_report_status'):
+                        self._send_status(params.get('token', [''])[0])
+                else:
+                    self._send_json({'message': 'Not found'}, status=404)
+
+            def do_POST(self):
+                parts = urlparse(self.path).path.strip('/').split('/')
+                body = self._read_body()
+                if parts[1:] == ['oauth', 'token']:
+                    if self._api('oauth_token'):
+                        self._send_json(dict(access_token=simulator.access_token or 'simulated-token',
+                                             expires_in=2592000))
+                elif parts[-1] == 'reports' and parts[1] == 'ad_accounts':
+                    name = 'create_report_from_template' if 'templates' in parts else 'create_report'
+                    if self._api(name):
+                        request = json.loads(body or b'{}')
+                        invalid = [column for column in request.get('columns', []) if column not in COLUMNS]
+                        if invalid:
+                            return self._send_json({'code': 1, 'message': f"'{invalid[0]}' is not one of "
+                                                                          f"{COLUMNS}"}, status=400)
+                        token = simulator._create_report(parts[2], request.get('start_date', '2024-01-01'),
+                                                         request.get('campaign_ids'))
+                        self._send_json(dict(report_status='IN_PROGRESS', token=token, message=None))
+                else:
+                    self._send_json({'message': 'Not found'}, status=404)
+
+            def _send_status(self, token: str):
+                report = simulator.reports.get(token)
+                if not report:
+                    return self._send_json(dict(report_status='DOES_NOT_EXIST', url=None, size=None))
+                if time.monotonic() - report['created'] < simulator.report_delay:
+                    return self._send_json(dict(report_status='IN_PROGRESS', url=None, size=None))
+                if report['account_id'] in simulator.failed_accounts:
+                    return self._send_json(dict(report_status='FAILED', url=None, size=None))
+                url = f'http://127.0.0.1:{simulator._server.server_port}/files/{token}.csv'
+                self._send_json(dict(report_status='FINISHED', url=url, size=None))
+
+            def _send_file(self, token: str):
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/csv')
+                self.send_header('Transfer-Encoding', 'chunked')
+                self.end_headers()
+                size = 0
+                buffer = []
+                for line in simulator._report_rows(token):
+                    buffer.append(line)
+                    if len(buffer) >= 1000:
+                        size += self._write_chunk(''.join(buffer).encode('utf-8'))
+                        buffer = []
+                if buffer:
+                    size += self._write_chunk(''.join(buffer).encode('utf-8'))
+                self.wfile.write(b'0\r\n\r\n')
+                with simulator._lock:
+                    simulator.downloaded_bytes += size
+
+            def _write_chunk(self, data: bytes) -> int:
+                self.wfile.write(f'{len(data):x}\r\n'.encode('ascii') + data + b'\r\n')
+                return len(data)
+
+        return Handler
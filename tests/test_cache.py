@@ -0,0 +1,34 @@
+import unittest
+
+from cache import TTLCache, cache_key
+
+
+class TestTTLCache(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 1000.0
+        self.storage = {}
+        self.cache = TTLCache(self.storage, ttl=60, max_entries=2, clock=lambda: self.now)
+
+    def test_expiration(self):
+        self.cache.set('a', {'token': 'x'})
+        self.now += 59
+        self.assertEqual({'token': 'x'}, self.cache.get('a'))
+        self.now += 2
+        self.assertIsNone(self.cache.get('a'))
+        self.assertEqual({}, self.storage)
+
+    def test_size_eviction(self):
+        for key in ('a', 'b', 'c'):
+            self.cache.set(key, key)
+            self.now += 1
+        self.assertIsNone(self.cache.get('a'))
+        self.assertEqual(['b', 'c'], sorted(self.storage))
+
+    def test_cache_key_is_stable(self):
+        self.assertEqual(cache_key('1', {'a': 1, 'b': [1, 2]}), cache_key('1', {'b': [1, 2], 'a': 1}))
+        self.assertNotEqual(cache_key('1', {'a': 1}), cache_key('2', {'a': 1}))
+
+
+if __name__ == "__main__":
+    unittest.main()
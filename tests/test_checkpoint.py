@@ -0,0 +1,56 @@
+import unittest
+
+from checkpoint import ReportCheckpoints
+
+
+class TestReportCheckpoints(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 1000.0
+        self.storage = {}
+        self.saves = 0
+        self.checkpoints = ReportCheckpoints(self.storage, save_function=self.save, ttl=3600, min_save_interval=10,
+                                             clock=lambda: self.now)
+
+    def save(self):
+        self.saves += 1
+
+    def test_status_updates(self):
+        self.checkpoints.add('hash', 'token', 'key')
+        self.checkpoints.update('token', 'FINISHED')
+        self.checkpoints.update('unknown', 'FINISHED')
+
+        self.assertEqual(dict(token='token', key='key', status='FINISHED'), self.checkpoints.get('hash'))
+        self.assertEqual(dict(token='token', key='key', status='FINISHED'), self.storage['hash']['value'])
+
+    def test_resumed_checkpoint_is_updated(self):
+        ReportCheckpoints(self.storage, save_function=self.save).add('hash', 'token', 'key')
+        self.checkpoints.get('hash')
+        self.checkpoints.update('token', 'DOWNLOADED')
+        self.assertEqual('DOWNLOADED', self.checkpoints.get('hash')['status'])
+
+    def test_saves_are_throttled(self):
+        self.checkpoints.save()
+        self.checkpoints.add('a', 'token-a', 'a')
+        self.checkpoints.save()
+        self.checkpoints.add('b', 'token-b', 'b')
+        self.checkpoints.save()
+        self.assertEqual(1, self.saves)
+        self.now += 10
+        self.checkpoints.save()
+        self.assertEqual(2, self.saves)
+        self.checkpoints.update('token-a', 'FINISHED')
+        self.checkpoints.save(force=True)
+        self.assertEqual(3, self.saves)
+
+    def test_expiration_and_clear(self):
+        self.checkpoints.add('a', 'token-a', 'a')
+        self.now += 3601
+        self.assertIsNone(self.checkpoints.get('a'))
+        self.checkpoints.add('b', 'token-b', 'b')
+        self.checkpoints.clear()
+        self.assertEqual({}, self.storage)
+
+
+if __name__ == "__main__":
+    unittest.main()
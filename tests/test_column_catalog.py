@@ -0,0 +1,33 @@
+import json
+import os
+import tempfile
+import unittest
+
+from column_catalog import snapshot_columns
+from configuration import LevelEnum
+
+
+class TestColumnCatalog(unittest.TestCase):
+
+    def setUp(self):
+        self.snapshot_path = os.path.join(tempfile.mkdtemp(), 'snapshot.json')
+        with open(self.snapshot_path, 'w') as snapshot:
+            json.dump({'created': 1000, 'levels': {'CAMPAIGN': ['SPEND_IN_DOLLAR', 'CAMPAIGN_NAME']}}, snapshot)
+
+    def columns(self, level: str, now: float):
+        return snapshot_columns(level, self.snapshot_path, ttl=1000, clock=lambda: now)
+
+    def test_snapshot_columns(self):
+        self.assertEqual(['SPEND_IN_DOLLAR', 'CAMPAIGN_NAME'], self.columns('CAMPAIGN', 1500))
+        self.assertIsNone(self.columns('KEYWORD', 1500))
+
+    def test_outdated_snapshot(self):
+        self.assertIsNone(self.columns('CAMPAIGN', 2500))
+
+    def test_bundled_snapshot_covers_all_levels(self):
+        for level in LevelEnum:
+            self.assertIn('SPEND_IN_DOLLAR', snapshot_columns(level.value, ttl=float('inf')))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+import csv
+import gzip
+import os
+import tempfile
+import unittest
+
+from keboola.component.exceptions import UserException
+
+from column_types import (TYPE_DATE, TYPE_NUMERIC, TYPE_STRING, TYPE_TIMESTAMP, ColumnTypeInference,
+                          infer_table_types, pyarrow_installed, write_parquet)
+
+COLUMNS = ['Account_ID', 'Date', 'Campaign ID', 'Campaign name', 'Spend in dollar', 'CTR', 'Empty']
+
+
+def write_slice(path: str, rows: list):
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, mode='wt', newline='', encoding='utf-8') as out:
+        csv.writer(out).writerows(rows)
+
+
+class TestColumnTypes(unittest.TestCase):
+
+    def test_inference(self):
+        inference = ColumnTypeInference(COLUMNS)
+        inference.update(['1000', '2024-01-01', '5', 'Campaign 5', '0.05', '1e-3', ''])
+        inference.update(['1000', '2024-01-02', '6', '6', '12', '', ''])
+        self.assertEqual({'Account_ID': TYPE_STRING, 'Date': TYPE_DATE, 'Campaign ID': TYPE_STRING,
+                          'Campaign name': TYPE_STRING, 'Spend in dollar': TYPE_NUMERIC, 'CTR': TYPE_NUMERIC,
+                          'Empty': TYPE_STRING}, inference.types())
+
+    def test_fallback_to_more_generic_type(self):
+        inference = ColumnTypeInference(['Date', 'Impressions'])
+        inference.update(['2024-01-01', '10'])
+        inference.update(['2024-01-01 05:00:00', 'n/a'])
+        self.assertEqual({'Date': TYPE_TIMESTAMP, 'Impressions': TYPE_STRING}, inference.types())
+
+    def test_invalid_date_is_string(self):
+        inference = ColumnTypeInference(['Date'])
+        inference.update(['2024-02-30'])
+        self.assertEqual({'Date': TYPE_STRING}, inference.types())
+
+    def test_infer_table_types_from_slices(self):
+        folder = tempfile.mkdtemp()
+        paths = [os.path.join(folder, 'a.csv'), os.path.join(folder, 'b.csv.gz')]
+        write_slice(paths[0], [['1000', '2024-01-01', '5', 'Campaign 5', '0.05', '0.1', '']])
+        write_slice(paths[1], [['1000', 'TOTAL', '6', 'Campaign 6', '0.06', '0.2', '']])
+        types = infer_table_types(COLUMNS, paths)
+        self.assertEqual(TYPE_STRING, types['Date'])
+        self.assertEqual(TYPE_DATE, infer_table_types(COLUMNS, paths, sample_rows=1)['Date'])
+
+    @unittest.skipUnless(pyarrow_installed(), 'pyarrow is not installed')
+    def test_write_parquet(self):
+        import pyarrow.parquet
+        folder = tempfile.mkdtemp()
+        path = os.path.join(folder, 'a.csv')
+        write_slice(path, [['1000', '2024-01-01', str(i), 'x', f'{i / 100}', '', ''] for i in range(5)])
+        types = infer_table_types(COLUMNS, [path])
+        out_path = os.path.join(folder, 'out.parquet')
+        self.assertEqual(5, write_parquet(COLUMNS, types, [path], out_path, row_group_size=2))
+        parquet_file = pyarrow.parquet.ParquetFile(out_path)
+        self.assertEqual(3, parquet_file.num_row_groups)
+        self.assertEqual([0.0, 0.01, 0.02, 0.03, 0.04], parquet_file.read().column('Spend in dollar').to_pylist())
+
+    @unittest.skipIf(pyarrow_installed(), 'pyarrow is installed')
+    def test_write_parquet_without_pyarrow(self):
+        with self.assertRaises(UserException):
+            write_parquet(COLUMNS, {}, [], 'out.parquet')
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,12 +3,50 @@ Created on 12. 11. 2018
 
 @author: esner
 '''
+import csv
+import functools
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
 import unittest
+
 import mock
-import os
 from freezegun import freeze_time
+from keboola.component.exceptions import UserException
 
+from Pinterest.governor import RateLimitGovernor
+from cache import TTLCache
 from component import Component
+from scheduler import PollingScheduler
+
+
+def build_component(parameters: dict, state: dict = None) -> Component:
+    """Create component instance working on a temporary data folder with given row parameters"""
+    data_dir = tempfile.mkdtemp()
+    for folder in ('in', 'out/tables', 'out/files'):
+        os.makedirs(os.path.join(data_dir, folder), exist_ok=True)
+    with open(os.path.join(data_dir, 'config.json'), 'w') as config_file:
+        json.dump({'parameters': parameters, 'authorization': {}}, config_file)
+    if state is not None:
+        with open(os.path.join(data_dir, 'in', 'state.json'), 'w') as state_file:
+            json.dump(state, state_file)
+    with mock.patch.dict(os.environ, {'KBC_DATADIR': data_dir}):
+        comp = Component()
+    comp._Component__init_configuration()
+    return comp
+
+
+SPECIFICATION_PARAMETERS = {
+    'input_variant': 'report_specification',
+    'accounts': ['1', '2', '3'],
+    'destination': {'table_name': 'output', 'incremental_loading': True},
+    'time_range': {'granularity': 'DAY', 'date_from': '2010-10-01', 'date_to': '2010-10-05'},
+    'report_specification': {'level': 'CAMPAIGN', 'columns': ['SPEND_IN_DOLLAR']},
+    'advanced': {'max_concurrency': 2}
+}
 
 
 class TestComponent(unittest.TestCase):
@@ -22,6 +60,217 @@ class TestComponent(unittest.TestCase):
             comp = Component()
             comp.run()
 
+    def test_optional_modules_are_not_imported_on_startup(self):
+        src_path = os.path.dirname(os.path.realpath(sys.modules[Component.__module__].__file__))
+        script = ("import sys, component; print(','.join(name for name in ('dateparser', 'numpy', 'pyarrow', "
+                  "'Pinterest.async_client') if name in sys.modules))")
+        output = subprocess.run([sys.executable, '-c', script], cwd=src_path, check=True, capture_output=True,
+                                text=True).stdout
+        self.assertEqual('', output.strip())
+
+    def test_start_reports_keeps_request_order(self):
+        comp = build_component(SPECIFICATION_PARAMETERS)
+        client = mock.Mock()
+        client.create_report.side_effect = lambda account_id, body, table_name: {'token': f'token-{account_id}'}
+        with mock.patch.object(Component, 'client', new_callable=mock.PropertyMock, return_value=client):
+            requests = [dict(key=acc, account_id=acc, body={}) for acc in ('1', '2', '3')]
+            started = comp._start_reports(requests)
+
+        self.assertEqual([dict(key=acc, account_id=acc, token=f'token-{acc}') for acc in ('1', '2', '3')],
+                         started)
+
+    def test_start_reports_fails_on_user_exception(self):
+        comp = build_component(SPECIFICATION_PARAMETERS)
+        client = mock.Mock()
+        client.create_report.side_effect = UserException('Failed to create report')
+        with mock.patch.object(Component, 'client', new_callable=mock.PropertyMock, return_value=client):
+            requests = [dict(key=acc, account_id=acc, body={}) for acc in ('1', '2', '3')]
+            with self.assertRaises(UserException):
+                comp._start_reports(requests)
+
+    def test_start_reports_stops_reading_requests_after_failure(self):
+        comp = build_component(SPECIFICATION_PARAMETERS)
+        client = mock.Mock()
+        client.create_report.side_effect = UserException('Failed to create report')
+        prepared = []
+
+        def slow_requests():
+            for index in range(20):
+                time.sleep(0.05)
+                prepared.append(index)
+                yield dict(key=str(index), account_id=str(index), body={})
+
+        with mock.patch.object(Component, 'client', new_callable=mock.PropertyMock, return_value=client), \
+                self.assertRaises(UserException):
+            comp._start_reports(slow_requests())
+
+        self.assertLess(len(prepared), 5)
+        self.assertLessEqual(client.create_report.call_count, len(prepared))
+
+    def test_start_reports_reuses_cached_report(self):
+        parameters = dict(SPECIFICATION_PARAMETERS, advanced={'report_cache_ttl': 60})
+        comp = build_component(parameters)
+        comp._report_cache = TTLCache({}, ttl=3600)
+        client = mock.Mock()
+        client.create_report.side_effect = lambda account_id, body, table_name: {'token': f'token-{account_id}'}
+        requests = [dict(key='1', account_id='1', body={'columns': ['SPEND_IN_DOLLAR']})]
+        with mock.patch.object(Component, 'client', new_callable=mock.PropertyMock, return_value=client):
+            comp._start_reports(requests)
+            started = comp._start_reports(requests)
+
+        self.assertEqual(1, client.create_report.call_count)
+        self.assertEqual('token-1', started[0]['token'])
+        self.assertTrue(started[0]['cached'])
+
+    def test_parquet_export_without_pyarrow_fails_before_reports(self):
+        parameters = dict(SPECIFICATION_PARAMETERS, destination={'table_name': 'output', 'parquet_export': True})
+        comp = build_component(parameters)
+        client = mock.Mock()
+        with mock.patch.object(Component, 'client', new_callable=mock.PropertyMock, return_value=client), \
+                mock.patch('component.pyarrow_installed', return_value=False), \
+                self.assertRaisesRegex(UserException, 'requires the pyarrow package'):
+            comp.run()
+
+        client.create_report.assert_not_called()
+
+    def test_list_templates_keeps_account_order(self):
+        comp = build_component(SPECIFICATION_PARAMETERS)
+        client = mock.Mock()
+        client.list_templates.side_effect = lambda account_id: [{'id': f't{account_id}', 'ad_account_id': account_id}]
+        with mock.patch.object(Component, 'client', new_callable=mock.PropertyMock, return_value=client):
+            templates = comp._list_templates(['1', '2', '3'])
+
+        self.assertEqual(['t1', 't2', 't3'], [template['id'] for template in templates])
+        self.assertEqual(3, client.list_templates.call_count)
+
+    def test_incremental_state_moves_start_date(self):
+        parameters = dict(SPECIFICATION_PARAMETERS)
+        parameters['time_range'] = dict(parameters['time_range'], incremental_state=True, lookback_days=2)
+        comp = build_component(parameters, state={'last_extracted': {'1': '2010-10-03', '2': '2010-10-08'}})
+        comp._state = comp.get_state_file()
+
+        report_requests, extracted_until = comp._prepare_report_requests()
+
+        self.assertEqual([('1', '2010-10-02'), ('3', '2010-10-01')],
+                         [(request['account_id'], request['body']['start_date']) for request in report_requests])
+        self.assertEqual({'1': '2010-10-05', '3': '2010-10-05'}, extracted_until)
+
+    def test_campaigns_are_listed_lazily(self):
+        comp = build_component(dict(SPECIFICATION_PARAMETERS, advanced={'campaigns_per_report': 2}))
+        comp._state = {}
+        client = mock.Mock()
+        client.list_campaigns.side_effect = lambda account_id: [{'id': f'{account_id}{i}'} for i in range(3)]
+        with mock.patch.object(Component, 'client', new_callable=mock.PropertyMock, return_value=client):
+            report_requests, _ = comp._prepare_report_requests()
+            client.list_campaigns.assert_not_called()
+
+            split_requests = comp._split_by_campaigns(report_requests)
+            first = next(split_requests)
+            self.assertEqual(1, client.list_campaigns.call_count)
+            split_requests = [first, *split_requests]
+
+        self.assertEqual(['1_part000', '1_part001', '2_part000', '2_part001', '3_part000', '3_part001'],
+                         [request['key'] for request in split_requests])
+        self.assertEqual(['10', '11'], first['body']['campaign_ids'])
+        self.assertNotIn('split_by_campaigns', first)
+
+    @freeze_time("2010-10-10")
+    def test_today_is_not_stored_as_extracted(self):
+        parameters = dict(SPECIFICATION_PARAMETERS, input_variant='existing_report_ids', existing_report_ids=['1:100'])
+        parameters['time_range'] = dict(parameters['time_range'], date_to='today', incremental_state=True)
+        comp = build_component(parameters, state={'last_extracted': {'1:100': '2010-10-09'}})
+        comp._state = comp.get_state_file()
+
+        report_requests, extracted_until = comp._prepare_report_requests()
+
+        self.assertEqual('2010-10-10', report_requests[0]['time_range']['start_date'])
+        self.assertEqual({'1:100': '2010-10-09'}, extracted_until)
+
+    def test_only_written_reports_advance_state(self):
+        comp = build_component(SPECIFICATION_PARAMETERS)
+        requests = [dict(key=acc, account_id=acc, state_key=acc) for acc in ('1', '2')]
+        written_reports = [comp._report_descriptor(requests[0], 'token-1')]
+
+        extracted_until = {'1': '2010-10-05', '2': '2010-10-05'}
+        self.assertEqual({'1': '2010-10-05'}, comp._completed_extraction(extracted_until, written_reports))
+
+    def test_incremental_state_requires_incremental_loading(self):
+        parameters = dict(SPECIFICATION_PARAMETERS, additional_reports=[
+            {'destination': {'table_name': 'templates', 'incremental_loading': False},
+             'input_variant': 'existing_report_ids', 'existing_report_ids': ['1:100']}])
+        parameters['time_range'] = dict(parameters['time_range'], incremental_state=True)
+        comp = build_component(parameters)
+        client = mock.Mock()
+        with mock.patch.object(Component, 'client', new_callable=mock.PropertyMock, return_value=client), \
+                self.assertRaisesRegex(UserException, 'Full load would replace the whole table templates'):
+            comp.run()
+
+        client.create_report.assert_not_called()
+        client.create_report_from_template.assert_not_called()
+
+    def test_additional_reports_have_own_keys_and_state(self):
+        parameters = dict(SPECIFICATION_PARAMETERS, additional_reports=[
+            {'destination': {'table_name': 'templates'}, 'input_variant': 'existing_report_ids',
+             'existing_report_ids': ['1:100']}])
+        parameters['time_range'] = dict(parameters['time_range'], incremental_state=True)
+        comp = build_component(parameters, state={'last_extracted': {'templates/1:100': '2010-10-03'}})
+        comp._state = comp.get_state_file()
+        definitions = comp._report_definitions()
+
+        report_requests, extracted_until = comp._prepare_report_requests(definitions[1])
+
+        self.assertEqual(2, len(definitions))
+        self.assertEqual([dict(key='templates_100', account_id='1', table_name='templates',
+                               state_key='templates/1:100', template_id='100',
+                               time_range={'start_date': '2010-10-04', 'end_date': '2010-10-05',
+                                           'granularity': 'DAY'})],
+                         report_requests)
+        self.assertEqual({'templates/1:100': '2010-10-05'}, extracted_until)
+
+    def test_access_token_is_reused_from_state(self):
+        comp = build_component(SPECIFICATION_PARAMETERS)
+        expires_at = time.time() + 30 * 24 * 3600
+        comp._pinterest_client = mock.Mock(access_token='access', token_expires_at=expires_at)
+        with mock.patch.object(Component, '_credentials', return_value=dict(refresh_token='secret')):
+            comp._store_access_token()
+
+        self.assertNotIn('secret', json.dumps(comp._state))
+        self.assertEqual(dict(token='access', token_expires_at=expires_at), comp._cached_access_token('secret'))
+        self.assertEqual({}, comp._cached_access_token('another refresh token'))
+        comp._state['authorization']['expires_at'] = time.time() + 60
+        self.assertEqual({}, comp._cached_access_token('secret'))
+
+    @freeze_time("2010-10-10")
+    def test_run_creates_output_table(self):
+        comp = build_component(SPECIFICATION_PARAMETERS)
+        client = mock.Mock()
+        client.create_report.side_effect = lambda account_id, body, table_name: {'token': f'token-{account_id}'}
+        client.governor = RateLimitGovernor()
+        client.get_report_status.side_effect = lambda account_id, token: {'report_status': 'FINISHED',
+                                                                          'url': f'https://reports/{account_id}'}
+
+        def download(url, path):
+            with open(path, 'w') as out:
+                out.write('Campaign ID,Spend in dollar\n')
+                out.write(f'{url[-1]}00,"1,5"\n')
+
+        with mock.patch.object(Component, 'client', new_callable=mock.PropertyMock, return_value=client), \
+                mock.patch.object(Component, '_download_file', side_effect=download), \
+                mock.patch('component.PollingScheduler', functools.partial(PollingScheduler, first_probe_delay=0)):
+            comp.run()
+
+        table_dir = os.path.join(comp.tables_out_path, 'output')
+        rows = []
+        for account_id in ('1', '2', '3'):
+            with open(os.path.join(table_dir, f'{account_id}.csv')) as table_file:
+                rows.extend(csv.reader(table_file))
+        self.assertEqual([['1', '100', '1,5'], ['2', '200', '1,5'], ['3', '300', '1,5']], rows)
+        with open(os.path.join(comp.tables_out_path, 'output.manifest')) as manifest_file:
+            manifest = json.load(manifest_file)
+        self.assertEqual(['Account_ID', 'Campaign_ID'], manifest['primary_key'])
+        with open(os.path.join(comp.data_folder_path, 'out', 'state.json')) as state_file:
+            self.assertEqual({}, json.load(state_file))
+
 
 if __name__ == "__main__":
     # import sys;sys.argv = ['', 'Test.testName']
@@ -0,0 +1,35 @@
+import datetime
+import unittest
+
+from keboola.component.exceptions import UserException
+
+from dates import parse_date, parse_native
+
+TODAY = datetime.date(2024, 3, 31)
+
+
+class TestDates(unittest.TestCase):
+
+    def test_iso(self):
+        self.assertEqual(datetime.date(2024, 2, 29), parse_native('2024-02-29', TODAY))
+        self.assertEqual(datetime.date(2024, 2, 29), parse_native(' 2024-02-29T10:15:00 ', TODAY))
+
+    def test_relative(self):
+        self.assertEqual(TODAY, parse_native('Today', TODAY))
+        self.assertEqual(datetime.date(2024, 3, 30), parse_native('yesterday', TODAY))
+        self.assertEqual(datetime.date(2024, 3, 24), parse_native('7 days ago', TODAY))
+        self.assertEqual(datetime.date(2024, 3, 17), parse_native('2 weeks ago', TODAY))
+        # the day is clamped to the length of the month
+        self.assertEqual(datetime.date(2024, 2, 29), parse_native('a month ago', TODAY))
+        self.assertEqual(datetime.date(2023, 3, 31), parse_native('1 year ago', TODAY))
+        self.assertEqual(datetime.date(2022, 12, 31), parse_native('15 months ago', TODAY))
+
+    def test_unsupported(self):
+        self.assertIsNone(parse_native('last week', TODAY))
+        self.assertIsNone(parse_native('2024-02-30', TODAY))
+
+    def test_parse_date(self):
+        self.assertEqual(datetime.date(2024, 2, 29), parse_date('2024-02-29'))
+        self.assertIsInstance(parse_date('last week'), datetime.date)
+        with self.assertRaises(UserException):
+            parse_date('not a date')
@@ -0,0 +1,53 @@
+import csv
+import os
+import tempfile
+import unittest
+
+from dedup import Deduplicator, deduplicate_slices, partition_count
+
+ROWS = [['1000', '2024-01-01', '1', 'old'],
+        ['1000', '2024-01-01', '2', 'a'],
+        ['1001', '2024-01-01', '1', 'b'],
+        ['1000', '2024-01-01', '1', 'new']]
+
+
+class TestDedup(unittest.TestCase):
+
+    def test_last_occurrence_is_kept(self):
+        deduplicator = Deduplicator([0, 1, 2])
+        rows = list(deduplicator.deduplicate(iter(ROWS)))
+        self.assertEqual([ROWS[1], ROWS[2], ROWS[3]], rows)
+        self.assertEqual((4, 3), (deduplicator.rows_in, deduplicator.rows_out))
+
+    def test_partitions_spilled_to_disk(self):
+        work_dir = tempfile.mkdtemp()
+        rows = [[str(i % 100), str(i)] for i in range(1000)]
+        deduplicator = Deduplicator([0], partitions=7, work_dir=work_dir)
+        result = list(deduplicator.deduplicate(iter(rows)))
+        self.assertEqual(100, len(result))
+        self.assertEqual({(str(i), str(900 + i)) for i in range(100)}, {tuple(row) for row in result})
+        self.assertEqual([], os.listdir(work_dir))
+
+    def test_deduplicate_slices(self):
+        folder = tempfile.mkdtemp()
+        paths = []
+        for index, rows in enumerate([ROWS[:2], ROWS[2:]]):
+            paths.append(os.path.join(folder, f'{index}.csv'))
+            with open(paths[-1], 'w', newline='') as out:
+                csv.writer(out).writerows(rows)
+        self.assertEqual(1, partition_count(paths))
+        self.assertEqual(2, partition_count(paths, partition_bytes=os.path.getsize(paths[0])))
+
+        result = []
+
+        class Writer:
+            writerow = result.append
+
+        deduplicator = deduplicate_slices(paths, [0, 1, 2], Writer(), partition_bytes=10)
+        self.assertEqual(3, len(result))
+        self.assertIn(ROWS[3], result)
+        self.assertEqual(deduplicator.partitions, partition_count(paths, 10))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+import gzip
+import os
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from downloader import DownloadQueue, DownloadSession, chunk_size_for
+
+CONTENT = 'Date,Spend\r\n2010-10-01,1.5\r\n'.encode('utf-8')
+
+
+class ReportHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    connections = set()
+
+    def do_GET(self):
+        ReportHandler.connections.add(self.client_address)
+        body = CONTENT
+        self.send_response(200)
+        if 'gzip' in self.headers.get('Accept-Encoding', ''):
+            body = gzip.compress(body)
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestDownloadQueue(unittest.TestCase):
+
+    def test_downloads_run_in_parallel(self):
+        barrier = threading.Barrier(3, timeout=5)
+
+        def download(url, path):
+            barrier.wait()
+            return path
+
+        with DownloadQueue(download, max_workers=3) as queue:
+            for i in range(3):
+                queue.submit(f'url{i}', f'path{i}')
+            self.assertEqual(['path0', 'path1', 'path2'], queue.join())
+
+    def test_failure_is_raised(self):
+        def download(url, path):
+            raise ValueError(url)
+
+        with self.assertRaises(ValueError):
+            with DownloadQueue(download, max_workers=2) as queue:
+                queue.submit('url', 'path')
+                queue.join()
+
+
+class TestDownloadSession(unittest.TestCase):
+
+    def setUp(self):
+        ReportHandler.connections = set()
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), ReportHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f'http://127.0.0.1:{self.server.server_port}/report.csv'
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_connection_is_reused(self):
+        session = DownloadSession(pool_size=1)
+        folder = tempfile.mkdtemp()
+        for i in range(3):
+            session.download(self.url, os.path.join(folder, f'{i}.csv'))
+            with open(os.path.join(folder, f'{i}.csv'), 'rb') as file:
+                self.assertEqual(CONTENT, file.read())
+        self.assertEqual(1, len(ReportHandler.connections))
+        self.assertEqual(3, session.files)
+
+    def test_open_text(self):
+        session = DownloadSession()
+        with session.open_text(self.url) as text:
+            self.assertEqual(CONTENT.decode('utf-8'), text.read())
+
+    def test_chunk_size(self):
+        self.assertEqual(64 * 1024, chunk_size_for('1000'))
+        self.assertEqual(4 * 1024 * 1024, chunk_size_for(str(10 ** 9)))
+        self.assertEqual(1024 * 1024, chunk_size_for(None))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,252 @@
+import asyncio
+import csv
+import functools
+import glob
+import json
+import os
+import time
+import unittest
+
+import mock
+from keboola.component import UserException
+
+from Pinterest.async_client import AsyncPinterestClient
+from Pinterest.client import PinterestClient
+from component import Component
+from scheduler import PollingScheduler
+from tests.simulator import PinterestSimulator
+from tests.test_component import build_component
+
+PARAMETERS = {
+    'input_variant': 'report_specification',
+    'destination': {'table_name': 'output', 'incremental_loading': True},
+    'time_range': {'granularity': 'DAY', 'date_from': '2024-01-01', 'date_to': '2024-01-10'},
+    'report_specification': {'level': 'CAMPAIGN', 'columns': ['SPEND_IN_DOLLAR', 'IMPRESSION_1']}
+}
+
+
+def run_component(simulator: PinterestSimulator, parameters: dict, state: dict = None) -> Component:
+    comp = build_component(parameters, state)
+    client = PinterestClient(token='token', base_url=simulator.base_url)
+
+    async def create_async_client():
+        comp._async_client = await AsyncPinterestClient.create(token='token', base_url=simulator.base_url)
+        return comp._async_client
+
+    with mock.patch.object(Component, 'client', new_callable=mock.PropertyMock, return_value=client), \
+            mock.patch.object(comp, '_create_async_client', create_async_client), \
+            mock.patch('component.PollingScheduler', functools.partial(PollingScheduler, first_probe_delay=0.1,
+                                                                       initial_delay=0.2)):
+        comp.run()
+    return comp
+
+
+def read_table(comp: Component) -> list:
+    rows = []
+    for path in sorted(glob.glob(os.path.join(comp.tables_out_path, 'output', '*.csv'))):
+        with open(path, newline='') as table_file:
+            rows.extend(csv.reader(table_file))
+    return rows
+
+
+class TestEndToEnd(unittest.TestCase):
+
+    def test_custom_report(self):
+        with PinterestSimulator(accounts=3, rows_per_report=20, report_delay=0.3) as simulator:
+            parameters = dict(PARAMETERS, accounts=simulator.account_ids)
+            comp = run_component(simulator, parameters)
+
+        rows = read_table(comp)
+        self.assertEqual(60, len(rows))
+        self.assertEqual(['1000', '2024-01-01', '5', 'Campaign 5, "quoted"', '0.05', '50'], rows[5])
+        self.assertEqual(3, simulator.request_counts['create_report'])
+        self.assertEqual(3, simulator.request_counts['download'])
+
+    def test_column_types_in_manifest(self):
+        with PinterestSimulator(accounts=1, rows_per_report=5, report_delay=0.1) as simulator:
+            destination = dict(PARAMETERS['destination'], column_types=True)
+            parameters = dict(PARAMETERS, accounts=simulator.account_ids, destination=destination)
+            comp = run_component(simulator, parameters)
+
+        with open(os.path.join(comp.tables_out_path, 'output.manifest')) as manifest_file:
+            manifest = json.load(manifest_file)
+        types = {column: metadata[0]['value'] for column, metadata in manifest['column_metadata'].items()}
+        self.assertEqual({'Account_ID': 'STRING', 'Date': 'DATE', 'Campaign_ID': 'STRING', 'Campaign_name': 'STRING',
+                          'Spend_in_dollar': 'NUMERIC', 'Impressions': 'NUMERIC'}, types)
+
+    def test_deduplicated_streaming_report(self):
+        with PinterestSimulator(accounts=2, rows_per_report=5, report_delay=0.1) as simulator:
+            destination = dict(PARAMETERS['destination'], deduplicate=True, slice_max_rows=3)
+            parameters = dict(PARAMETERS, accounts=simulator.account_ids, destination=destination,
+                              advanced={'streaming_ingest': True})
+            comp = run_component(simulator, parameters)
+
+        self.assertEqual(['deduplicated_0000.csv', 'deduplicated_0001.csv', 'deduplicated_0002.csv',
+                          'deduplicated_0003.csv'], sorted(os.listdir(os.path.join(comp.tables_out_path, 'output'))))
+        self.assertEqual(10, len(read_table(comp)))
+        self.assertEqual(0, comp.metrics.counters['duplicate_rows'])
+
+    def test_sharded_streaming_report_with_rate_limits(self):
+        with PinterestSimulator(accounts=2, rows_per_report=5, report_delay=0.1, rate_limit_every=4) as simulator:
+            parameters = dict(PARAMETERS, accounts=simulator.account_ids,
+                              advanced={'streaming_ingest': True, 'max_days_per_report': 5})
+            comp = run_component(simulator, parameters)
+
+        rows = read_table(comp)
+        self.assertEqual(20, len(rows))
+        self.assertEqual({'2024-01-01', '2024-01-06'}, {row[1] for row in rows})
+        self.assertEqual([], glob.glob(os.path.join(comp.files_out_path, '*')))
+
+    def test_additional_reports(self):
+        additional_report = {'destination': {'table_name': 'keywords'},
+                             'report_specification': {'level': 'KEYWORD', 'columns': ['SPEND_IN_DOLLAR']}}
+        with PinterestSimulator(accounts=2, rows_per_report=10, report_delay=0.2) as simulator:
+            parameters = dict(PARAMETERS, accounts=simulator.account_ids, additional_reports=[additional_report])
+            comp = run_component(simulator, parameters)
+
+        self.assertEqual(20, len(read_table(comp)))
+        self.assertEqual(['keywords_1000.csv', 'keywords_1001.csv'],
+                         sorted(os.listdir(os.path.join(comp.tables_out_path, 'keywords'))))
+        self.assertTrue(os.path.exists(os.path.join(comp.tables_out_path, 'keywords.manifest')))
+        self.assertEqual(4, simulator.request_counts['create_report'])
+        self.assertEqual(4, simulator.request_counts['download'])
+
+    def test_report_split_by_campaigns(self):
+        for async_mode in (False, True):
+            with self.subTest(async_mode=async_mode), \
+                    PinterestSimulator(accounts=2, rows_per_report=7, report_delay=0.1) as simulator:
+                parameters = dict(PARAMETERS, accounts=simulator.account_ids,
+                                  advanced={'async_mode': async_mode, 'campaigns_per_report': 3})
+                comp = run_component(simulator, parameters)
+
+                rows = read_table(comp)
+                self.assertEqual(14, len(rows))
+                self.assertEqual({(account_id, str(i)) for account_id in simulator.account_ids for i in range(7)},
+                                 {(row[0], row[2]) for row in rows})
+                self.assertEqual(2, simulator.request_counts['list_campaigns'])
+                self.assertEqual(6, simulator.request_counts['create_report'])
+                self.assertIn('1000_part002', comp.metrics.reports)
+
+    def test_small_reports_served_by_sync_analytics(self):
+        for streaming in (False, True):
+            with self.subTest(streaming=streaming), \
+                    PinterestSimulator(accounts=2, rows_per_report=5, report_delay=0.1) as simulator:
+                parameters = dict(PARAMETERS, accounts=simulator.account_ids,
+                                  time_range={'granularity': 'DAY', 'date_from': '3 days ago', 'date_to': 'yesterday'},
+                                  advanced={'sync_analytics': True, 'streaming_ingest': streaming})
+                first_run = run_component(simulator, parameters)
+                self.assertEqual(2, simulator.request_counts['create_report'])
+                self.assertNotIn('campaign_analytics', simulator.request_counts)
+
+                second_run = run_component(simulator, parameters, state=first_run._state)
+                self.assertEqual(2, simulator.request_counts['create_report'])
+                self.assertEqual(2, simulator.request_counts['campaign_analytics'])
+                self.assertEqual(2, simulator.request_counts['list_campaigns'])
+
+                def parsed(rows):
+                    return sorted((row[0], row[1], row[2], row[3], float(row[4]), float(row[5])) for row in rows)
+
+                self.assertEqual(10, len(read_table(second_run)))
+                self.assertEqual(parsed(read_table(first_run)), parsed(read_table(second_run)))
+
+    def test_all_accessible_accounts(self):
+        for async_mode in (False, True):
+            with self.subTest(async_mode=async_mode), \
+                    PinterestSimulator(accounts=5, rows_per_report=2, report_delay=0.1, page_size=2,
+                                       latency=0.05) as simulator:
+                parameters = dict(PARAMETERS, all_accounts=True, advanced={'async_mode': async_mode},
+                                  time_range=dict(PARAMETERS['time_range'], incremental_state=True))
+                comp = run_component(simulator, parameters)
+
+                self.assertEqual(10, len(read_table(comp)))
+                self.assertEqual(3, simulator.request_counts['list_accounts'])
+                self.assertEqual(5, simulator.request_counts['create_report'])
+                log = simulator.request_log
+                # reports of the first page of accounts are created before the last page is listed
+                self.assertLess(log.index('create_report'), len(log) - 1 - log[::-1].index('list_accounts'))
+                self.assertEqual(set(simulator.account_ids), set(comp._state['last_extracted']))
+
+    def test_interrupted_run_is_resumed(self):
+        written_states = []
+
+        def write_state_file(_, state):
+            written_states.append(json.loads(json.dumps(state)))
+
+        with PinterestSimulator(accounts=3, rows_per_report=10, report_delay=0.2) as simulator:
+            parameters = dict(PARAMETERS, accounts=simulator.account_ids, advanced={'resume_interrupted_runs': True})
+            with mock.patch.object(Component, 'write_state_file', autospec=True, side_effect=write_state_file), \
+                    mock.patch.object(Component, '_download_report', side_effect=RuntimeError('Killed')), \
+                    self.assertRaises(RuntimeError):
+                run_component(simulator, parameters)
+            checkpoints = written_states[-1]['report_checkpoints']
+            comp = run_component(simulator, parameters, state=written_states[-1])
+
+        self.assertEqual(3, len(checkpoints))
+        self.assertIn('FINISHED', {checkpoint['value']['status'] for checkpoint in checkpoints.values()})
+        self.assertEqual(30, len(read_table(comp)))
+        self.assertEqual(3, simulator.request_counts['create_report'])
+        with open(os.path.join(comp.data_folder_path, 'out', 'state.json')) as state_file:
+            self.assertNotIn('report_checkpoints', json.load(state_file))
+
+    def test_failed_report_fails_the_run(self):
+        for advanced in ({'streaming_ingest': True}, {'streaming_ingest': True, 'async_mode': True}):
+            with self.subTest(**advanced), \
+                    PinterestSimulator(accounts=2, rows_per_report=5, report_delay=0.1,
+                                       failed_accounts=('1001',)) as simulator:
+                parameters = dict(PARAMETERS, accounts=simulator.account_ids, advanced=advanced)
+                with self.assertRaisesRegex(UserException, 'Report 1001 in account 1001 .* FAILED'):
+                    run_component(simulator, parameters)
+
+    def test_async_mode(self):
+        with PinterestSimulator(accounts=3, rows_per_report=20, report_delay=0.3, rate_limit_every=5) as simulator:
+            parameters = dict(PARAMETERS, accounts=simulator.account_ids, advanced={'async_mode': True})
+            comp = run_component(simulator, parameters)
+
+        rows = read_table(comp)
+        self.assertEqual(60, len(rows))
+        self.assertEqual(['1001', '2024-01-01', '5', 'Campaign 5, "quoted"', '0.05', '50'], rows[25])
+        self.assertEqual(3, simulator.request_counts['create_report'])
+        self.assertEqual(3, simulator.request_counts['download'])
+        self.assertEqual(simulator.downloaded_bytes, comp.metrics.counters['downloaded_bytes'])
+
+    def test_async_mode_streaming(self):
+        with PinterestSimulator(accounts=2, rows_per_report=5, report_delay=0.1) as simulator:
+            parameters = dict(PARAMETERS, accounts=simulator.account_ids,
+                              advanced={'async_mode': True, 'streaming_ingest': True, 'max_days_per_report': 5})
+            comp = run_component(simulator, parameters)
+
+        rows = read_table(comp)
+        self.assertEqual(20, len(rows))
+        self.assertEqual({'2024-01-01', '2024-01-06'}, {row[1] for row in rows})
+        self.assertEqual([], glob.glob(os.path.join(comp.files_out_path, '*')))
+
+    def test_async_client_error_translation(self):
+        async def list_templates(base_url):
+            async with AsyncPinterestClient(token='token', base_url=base_url) as client:
+                return await client.list_templates('1000/unknown')
+
+        with PinterestSimulator() as simulator:
+            with self.assertRaisesRegex(UserException, 'HTTP Error 404 in listing templates'):
+                asyncio.run(list_templates(simulator.base_url))
+
+    def test_expired_access_token_is_refreshed(self):
+        async def list_accounts_async(base_url):
+            async with await AsyncPinterestClient.create(token='expired', refresh_token='refresh',
+                                                         base_url=base_url) as client:
+                return await client.list_accounts(), client.access_token
+
+        with PinterestSimulator(accounts=2, access_token='fresh') as simulator:
+            client = PinterestClient(token='expired', refresh_token='refresh', base_url=simulator.base_url)
+            accounts = client.list_accounts()
+            async_accounts, async_token = asyncio.run(list_accounts_async(simulator.base_url))
+
+        self.assertEqual(accounts, async_accounts)
+        self.assertEqual(['1000', '1001'], [account['id'] for account in accounts])
+        self.assertEqual(('fresh', 'fresh'), (client.access_token, async_token))
+        self.assertGreater(client.token_expires_at, time.time())
+        self.assertEqual(2, simulator.request_counts['oauth_token'])
+        self.assertEqual(2, simulator.request_counts['list_accounts_unauthorized'])
+
+
+if __name__ == "__main__":
+    unittest.main()
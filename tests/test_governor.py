@@ -0,0 +1,55 @@
+import unittest
+
+import mock
+
+from Pinterest.client import PinterestClient
+from Pinterest.governor import RateLimitGovernor
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class TestRateLimitGovernor(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.governor = RateLimitGovernor(rate=2, burst=2, clock=self.clock, sleep=self.clock.sleep)
+
+    def test_token_bucket(self):
+        for _ in range(4):
+            self.governor.acquire()
+        self.assertEqual(1.0, self.clock.now)
+        self.assertEqual(2, self.governor.throttled_requests)
+
+    def test_learns_from_headers(self):
+        self.governor.update({'x-ratelimit-remaining': '0', 'x-ratelimit-reset': '30'})
+        self.governor.acquire()
+        self.assertEqual(30, self.clock.now)
+        self.assertEqual(30, self.governor.throttled_seconds)
+
+
+class TestPinterestClientRateLimit(unittest.TestCase):
+
+    def test_retries_rate_limited_request(self):
+        client = PinterestClient(token='token')
+        client.governor = RateLimitGovernor(sleep=lambda seconds: None)
+        limited = mock.Mock(status_code=429, headers={'Retry-After': '3'})
+        ok = mock.Mock(status_code=200, headers={})
+        ok.json.return_value = {'items': [], 'bookmark': None}
+        with mock.patch.object(client.client, '_request_raw', side_effect=[limited, ok]) as request:
+            self.assertEqual([], client.list_accounts())
+        self.assertEqual(2, request.call_count)
+        self.assertAlmostEqual(3, client.governor.throttled_seconds, places=1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,25 @@
+import unittest
+
+from metrics import RunMetrics
+
+
+class TestRunMetrics(unittest.TestCase):
+
+    def test_phases_and_reports(self):
+        now = [0.0]
+        metrics = RunMetrics(clock=lambda: now[0])
+        for key in ('a', 'b'):
+            with metrics.phase('download', key):
+                now[0] += 1.5
+            metrics.add_report_values(key, rows=10, bytes=100)
+        metrics.increment('throttled_requests', 2)
+
+        result = metrics.to_dict()
+        self.assertEqual(3.0, result['total_seconds'])
+        self.assertEqual(dict(seconds=3.0, count=2), result['phases']['download'])
+        self.assertEqual(dict(download_seconds=1.5, rows=10, bytes=100), result['reports']['a'])
+        self.assertEqual(dict(throttled_requests=2), result['counters'])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+import csv
+import gzip
+import io
+import os
+import tempfile
+import unittest
+
+from keboola.component.exceptions import UserException
+
+from output_writer import (ENGINE_BLOCKS, ENGINE_VECTORIZED, SharedHeader, SliceWriter, ingest_report_stream,
+                           numpy_installed, prefix_records, quoted_prefix, report_slices,
+                           write_blocks_with_account)
+
+RECORDS = [['2010-10-01', 'multi\r\nline, "quoted" name'], ['2010-10-02', 'plain'], ['2010-10-03', '"\n"']]
+
+
+class TestOutputWriter(unittest.TestCase):
+
+    def test_header_mismatch(self):
+        header = SharedHeader()
+        header.check(['Date', 'Campaign ID', 'Spend'])
+        header.check(['Date', 'Campaign ID', 'Spend'])
+        with self.assertRaisesRegex(UserException, 'Impressions/Spend'):
+            header.check(['Date', 'Campaign ID', 'Impressions'])
+
+    def test_ingest_report_stream(self):
+        header = SharedHeader()
+        in_file = io.StringIO('Date,Campaign name\r\n2010-10-01,"multi\r\nline, name"\r\n2010-10-02,plain\r\n')
+        out_file = io.StringIO(newline='')
+        rows = ingest_report_stream(in_file, csv.writer(out_file), '123', header)
+        self.assertEqual(2, rows)
+        self.assertEqual(['Date', 'Campaign name'], header.columns)
+        self.assertEqual('123,2010-10-01,"multi\r\nline, name"\r\n123,2010-10-02,plain\r\n', out_file.getvalue())
+
+    def test_slice_rollover_by_rows(self):
+        folder = tempfile.mkdtemp()
+        with SliceWriter(folder, 'report', max_rows=2, compress=True) as writer:
+            for i in range(5):
+                writer.writerow([str(i), 'value'])
+        self.assertEqual(['report_0000.csv.gz', 'report_0001.csv.gz', 'report_0002.csv.gz'],
+                         sorted(os.listdir(folder)))
+        with gzip.open(os.path.join(folder, 'report_0002.csv.gz'), 'rt', newline='') as slice_file:
+            self.assertEqual('4,value\r\n', slice_file.read())
+
+    def test_slice_rollover_by_size(self):
+        folder = tempfile.mkdtemp()
+        with SliceWriter(folder, 'report', max_bytes=10) as writer:
+            writer.SIZE_CHECK_ROWS = 1
+            for i in range(3):
+                writer.writerow(['0123456789'])
+        self.assertEqual(3, len(writer.paths))
+
+    def test_single_slice_without_limits(self):
+        folder = tempfile.mkdtemp()
+        with SliceWriter(folder, 'report') as writer:
+            writer.writerow(['a'])
+        self.assertEqual(['report.csv'], os.listdir(folder))
+
+    def _prefixed_records(self, engine: str, block_size: int) -> tuple:
+        data = io.StringIO(newline='')
+        csv.writer(data).writerows(RECORDS)
+        blocks = list(prefix_records(io.BytesIO(data.getvalue().encode('utf-8')), quoted_prefix('1"2'),
+                                     block_size=block_size, engine=engine))
+        output = b''.join(block for block, _, _ in blocks).decode('utf-8')
+        return list(csv.reader(io.StringIO(output, newline=''))), sum(rows for _, rows, _ in blocks)
+
+    def test_report_slices(self):
+        folder = tempfile.mkdtemp()
+        for name in ['1000.csv', '1000_0000.csv.gz', '1000_2024-01-06.csv', '10000.csv', '1000.raw.csv']:
+            open(os.path.join(folder, name), 'w').close()
+        self.assertEqual([os.path.join(folder, '1000.csv'), os.path.join(folder, '1000_0000.csv.gz')],
+                         report_slices(folder, '1000'))
+
+    def test_prefix_records(self):
+        engines = [ENGINE_BLOCKS] + ([ENGINE_VECTORIZED] if numpy_installed() else [])
+        for engine in engines:
+            for block_size in (1, 5, 1000):
+                with self.subTest(engine=engine, block_size=block_size):
+                    records, rows = self._prefixed_records(engine, block_size)
+                    self.assertEqual([['1"2'] + record for record in RECORDS], records)
+                    self.assertEqual(3, rows)
+
+    def test_write_blocks_rolls_over_at_record_boundaries(self):
+        folder = tempfile.mkdtemp()
+        in_file = io.BytesIO(b'a,"x\ny"\nb,z\nc,z\n')
+        with SliceWriter(folder, 'report', max_bytes=1) as writer:
+            rows = write_blocks_with_account(in_file, writer, '1', block_size=4)
+        self.assertEqual(3, rows)
+        contents = []
+        for path in writer.paths:
+            with open(path, newline='') as slice_file:
+                contents.append(slice_file.read())
+        self.assertEqual(['"1",a,"x\ny"\n', '"1",b,z\n', '"1",c,z\n'], contents)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+import random
+import unittest
+
+from scheduler import PollingScheduler
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class TestPollingScheduler(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.scheduler = PollingScheduler(first_probe_delay=1, initial_delay=5, max_delay=20, backoff_factor=2,
+                                          jitter=0, max_requests_per_second=2,
+                                          clock=self.clock, sleep=self.clock.sleep, rng=random.Random(0))
+
+    def test_first_probe_and_backoff(self):
+        self.scheduler.add('a', 'report-a')
+        due_times = []
+        for _ in range(5):
+            key, item = self.scheduler.next_due()
+            due_times.append(self.clock.now)
+            self.scheduler.reschedule(key)
+        self.assertEqual([1, 6, 16, 36, 56], due_times)
+        self.assertEqual('report-a', item)
+
+    def test_rate_limit_spreads_requests(self):
+        for key in ('a', 'b', 'c'):
+            self.scheduler.add(key, key)
+        due_times = []
+        while self.scheduler:
+            key, _ = self.scheduler.next_due()
+            due_times.append(self.clock.now)
+            self.scheduler.complete(key)
+        self.assertEqual([1, 1.5, 2], due_times)
+
+    def test_statistics(self):
+        self.scheduler.add('a', 'a')
+        key, _ = self.scheduler.next_due()
+        self.scheduler.reschedule(key)
+        key, _ = self.scheduler.next_due()
+        self.scheduler.complete(key)
+        self.assertEqual(dict(poll_count=2, wait_time=6), self.scheduler.statistics('a'))
+
+
+if __name__ == "__main__":
+    unittest.main()
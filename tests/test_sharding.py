@@ -0,0 +1,32 @@
+import unittest
+
+from sharding import shard_date_range, shard_entities
+
+
+class TestSharding(unittest.TestCase):
+
+    def test_no_sharding(self):
+        self.assertEqual([('2024-01-01', '2024-03-01')], shard_date_range('2024-01-01', '2024-03-01', 'DAY', 0))
+        self.assertEqual([('2024-01-01', '2024-03-01')], shard_date_range('2024-01-01', '2024-03-01', 'TOTAL', 10))
+
+    def test_day_windows(self):
+        self.assertEqual([('2024-01-01', '2024-01-10'), ('2024-01-11', '2024-01-20'), ('2024-01-21', '2024-01-25')],
+                         shard_date_range('2024-01-01', '2024-01-25', 'DAY', 10))
+
+    def test_week_windows_are_aligned(self):
+        # 2024-01-03 is Wednesday
+        self.assertEqual([('2024-01-03', '2024-01-14'), ('2024-01-15', '2024-01-28'), ('2024-01-29', '2024-01-31')],
+                         shard_date_range('2024-01-03', '2024-01-31', 'WEEK', 14))
+
+    def test_month_windows_are_aligned(self):
+        self.assertEqual([('2023-11-15', '2023-12-31'), ('2024-01-01', '2024-02-29'), ('2024-03-01', '2024-03-10')],
+                         shard_date_range('2023-11-15', '2024-03-10', 'MONTH', 60))
+
+    def test_entity_batches(self):
+        self.assertEqual([None], shard_entities(['1', '2'], 0))
+        self.assertEqual([None], shard_entities(['1', '2'], 2))
+        self.assertEqual([['1', '2'], ['3']], shard_entities(['3', '1', '2'], 2))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,41 @@
+import datetime
+import unittest
+
+from sync_analytics import analytics_params, analytics_rows, column_fields, is_small_report
+
+BODY = {'start_date': '2024-03-01', 'end_date': '2024-03-03', 'granularity': 'DAY', 'click_window_days': 30,
+        'engagement_window_days': 30, 'view_window_days': 30, 'conversion_report_time': 'TIME_OF_AD_ACTION',
+        'columns': ['SPEND_IN_DOLLAR', 'IMPRESSION_1'], 'level': 'CAMPAIGN', 'report_format': 'CSV'}
+HEADER = ['Date', 'Campaign ID', 'Campaign name', 'Spend in dollar', 'Impressions']
+
+
+class TestSyncAnalytics(unittest.TestCase):
+
+    def test_small_report(self):
+        today = datetime.date(2024, 3, 10)
+        self.assertTrue(is_small_report(BODY, today))
+        self.assertFalse(is_small_report(dict(BODY, end_date='2024-03-09'), today))
+        self.assertFalse(is_small_report(dict(BODY, level='KEYWORD'), today))
+        self.assertFalse(is_small_report(dict(BODY, granularity='HOUR'), today))
+        self.assertTrue(is_small_report(dict(BODY, granularity='TOTAL'), today))
+        self.assertFalse(is_small_report(dict(BODY, columns=[f'C{i}' for i in range(21)]), today))
+        self.assertFalse(is_small_report(BODY, datetime.date(2024, 6, 10)))
+
+    def test_column_fields(self):
+        self.assertEqual(['DATE', 'CAMPAIGN_ID', 'Campaign name', 'SPEND_IN_DOLLAR', 'IMPRESSION_1'],
+                         column_fields(HEADER, BODY['columns']))
+        # ambiguous, unknown and missing columns can't be mapped
+        self.assertIsNone(column_fields(HEADER, ['SPEND_IN_DOLLAR', 'IMPRESSION_1', 'IMPRESSION_2']))
+        self.assertIsNone(column_fields(HEADER + ['Ad group ID'], BODY['columns']))
+        self.assertIsNone(column_fields(HEADER[:4], BODY['columns']))
+
+    def test_analytics_rows(self):
+        fields = column_fields(HEADER, BODY['columns'])
+        items = [dict(DATE='2024-03-01', CAMPAIGN_ID=5, SPEND_IN_DOLLAR=0.05, IMPRESSION_1=50.0)]
+        self.assertEqual([['2024-03-01', '5', 'Campaign 5', '0.05', '50']],
+                         analytics_rows(items, fields, {'5': 'Campaign 5'}))
+        self.assertEqual('SPEND_IN_DOLLAR,IMPRESSION_1', analytics_params(BODY)['columns'])
+
+
+if __name__ == "__main__":
+    unittest.main()